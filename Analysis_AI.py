@@ -0,0 +1,136 @@
+"""
+Objective: This file contains the move analysis of the user interface: the scores of every valid
+           move of a position, which rate the moves of both players (their accuracy), give the
+           player hints and show the best move.
+
+           Each position is searched once and its scores are kept, so everything that rates the
+           moves of a position reads the same scores. Each move is scored by a search of the
+           position after it with the full window, so every score is exact (an alpha-beta search
+           of the position itself only finds the score of its best move). Moves whose subtree in
+           a GameTree (e.g. the computer player's) was already searched to the same depth are not
+           searched again, unless a finished game was reached in it: GameTree and the search
+           engine do not score finished games the same way.
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+from typing import Any, Optional
+
+from Bitboard_Game import legal_moves
+from Ordering_AI import MoveOrdering
+from Search_AI import Searcher
+from Transposition_AI import EXACT, TranspositionTable
+
+
+class MoveAnalysis:
+    """
+    The scores (from white's point of view) of every valid move of the positions of a game.
+
+    Instance Attributes:
+        - depth: the depth of the analysis (at least 2): each move is scored by a search of the
+                 position after it to depth - 1
+        - searcher: the search engine of the analysis, with a transposition table and a move
+                    ordering shared by all of its searches. Its 'leaf' evaluation gives the same
+                    scores as GameTree, except for finished games (see Search_AI).
+        - searches: the number of positions analysed (not found in the cache)
+    """
+    # Private Instance Attributes:
+    #   - _cache: the scores of the moves of each position analysed, by the Zobrist hash of the
+    #             position
+    depth: int
+    searcher: Searcher
+    searches: int
+    _cache: dict[int, dict]
+
+    def __init__(self, depth: int = 4) -> None:
+        self.depth = depth
+        self.searcher = Searcher(TranspositionTable(), MoveOrdering())
+        self.searches = 0
+        self._cache = {}
+
+    def scores(self, game: Any, tree: Any = None) -> dict:
+        """
+        Return the score of every valid move of the current state of game, a mapping from each
+        move to its score. There are no moves if the player to move has to pass.
+
+        tree is an optional GameTree: if its root is the current state of game, the moves whose
+        subtree was searched to depth - 1 with an exact score, without reaching a finished game,
+        are not searched again. game is not changed.
+        """
+        key = game.zobrist
+        if key in self._cache:
+            return self._cache[key]
+
+        if tree is not None and tree.position.zobrist != key:
+            tree = None
+
+        scores = {}
+        for move in game.get_valid_moves_now():
+            subtree = tree.find_subtree_by_move(move) if tree is not None else None
+            if subtree is not None and subtree.searched_depth == self.depth - 1 \
+                    and subtree.bound == EXACT and not _reaches_end(subtree):
+                scores[move] = subtree.score
+            else:
+                game_copy = game.copy()
+                game_copy.make_move(move[0], move[1])
+                scores[move] = self.searcher.search(game_copy, self.depth - 1)[1]
+
+        self.searches += 1
+        self._cache[key] = scores
+        return scores
+
+    def is_analysed(self, game: Any) -> bool:
+        """
+        Return whether the current state of game was already analysed, so that scores returns
+        at once.
+        """
+        return game.zobrist in self._cache
+
+    def best_move(self, game: Any) -> Optional[tuple]:
+        """
+        Return the best move of the current state of game for the player to move, or None if
+        they have to pass.
+        """
+        scores = self.scores(game)
+        if scores == {}:
+            return None
+        if game.is_white_move:
+            return max(scores, key=lambda move: scores[move])
+        else:
+            return min(scores, key=lambda move: scores[move])
+
+    def accuracy(self, game: Any, move: tuple) -> float:
+        """
+        Return how good move is in the current state of game, between 0 (the worst valid move)
+        and 1 (the best one). A pass, and any move when all moves are equally good, has an
+        accuracy of 1; a move which is not valid has an accuracy of 0.
+        """
+        scores = self.scores(game)
+        if scores == {}:
+            return 1.0
+        max_score = max(scores.values())
+        min_score = min(scores.values())
+        if max_score == min_score:
+            return 1.0
+        if move not in scores:
+            return 0.0
+
+        if game.is_white_move:
+            return (scores[move] - min_score) / (max_score - min_score)
+        else:
+            return (max_score - scores[move]) / (max_score - min_score)
+
+
+def _reaches_end(tree: Any) -> bool:
+    """
+    Return whether a finished game was reached anywhere in tree (a GameTree). GameTree scores a
+    finished game with a pass below it, unlike Searcher.
+    """
+    stack = [tree]
+    while stack != []:
+        node = stack.pop()
+        position = node.position
+        if node.move == ('', '') and legal_moves(position.white, position.black) == 0 \
+                and legal_moves(position.black, position.white) == 0:
+            return True
+        stack.extend(node.get_subtrees())
+    return False
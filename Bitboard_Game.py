@@ -0,0 +1,570 @@
+"""
+Objective: This file contains a bitboard implementation of the Othello rules. The board is stored
+           as two 64-bit integers (one per color) and legal moves and flips are computed with
+           shift-and-mask operations instead of walking an 8x8 list cell by cell.
+
+           BitboardOthello exposes the same public interface as Othello_Game.Othello, so GameTree
+           and the computer players run on it unchanged.
+
+           Square (y, x) is stored in bit y * 8 + x.
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+from __future__ import annotations
+
+import random
+from typing import Any
+
+# All 64 squares
+FULL = 0xFFFFFFFFFFFFFFFF
+
+# Masks that remove the squares which wrapped around to the other side of the board after a shift
+NOT_COL_0 = 0xFEFEFEFEFEFEFEFE
+NOT_COL_7 = 0x7F7F7F7F7F7F7F7F
+
+# The 8 directions as (shift, mask). A positive shift moves towards higher bits (down/right).
+DIRECTIONS = [(1, NOT_COL_0),    # right
+              (-1, NOT_COL_7),   # left
+              (8, FULL),         # down
+              (-8, FULL),        # up
+              (9, NOT_COL_0),    # down-right
+              (7, NOT_COL_7),    # down-left
+              (-7, NOT_COL_0),   # up-right
+              (-9, NOT_COL_7)]   # up-left
+# The same directions, split by the direction of the shift
+DOWN_DIRECTIONS = [(amount, mask) for amount, mask in DIRECTIONS if amount > 0]
+UP_DIRECTIONS = [(-amount, mask) for amount, mask in DIRECTIONS if amount < 0]
+
+# The 8 symmetries of the board, as functions of (row, column)
+SYMMETRIES = [lambda y, x: (y, x),
+              lambda y, x: (y, 7 - x),
+              lambda y, x: (7 - y, x),
+              lambda y, x: (7 - y, 7 - x),
+              lambda y, x: (x, y),
+              lambda y, x: (x, 7 - y),
+              lambda y, x: (7 - x, y),
+              lambda y, x: (7 - x, 7 - y)]
+
+# For each symmetry, the square each square is moved to
+PERMUTATIONS = [[y * 8 + x for y, x in (symmetry(s >> 3, s & 7) for s in range(0, 64))]
+                for symmetry in SYMMETRIES]
+
+# Random numbers for Zobrist hashing: one for each (square, color), and one for white to move.
+# They are generated from a fixed seed, so the hash of a position is the same in every process.
+_zobrist_random = random.Random(2021)
+ZOBRIST_WHITE = [_zobrist_random.getrandbits(64) for _ in range(0, 64)]
+ZOBRIST_BLACK = [_zobrist_random.getrandbits(64) for _ in range(0, 64)]
+ZOBRIST_WHITE_MOVE = _zobrist_random.getrandbits(64)
+# Flipping the piece on a square changes the hash by ZOBRIST_WHITE[square] ^ ZOBRIST_BLACK[square]
+ZOBRIST_FLIP = [ZOBRIST_WHITE[i] ^ ZOBRIST_BLACK[i] for i in range(0, 64)]
+
+
+####################################################################################
+# Bitboard helper functions
+####################################################################################
+def shift(bitboard: int, amount: int, mask: int) -> int:
+    """
+    Shift every square of the bitboard by amount, discarding squares that leave the board.
+    """
+    if amount > 0:
+        return (bitboard << amount) & mask & FULL
+    else:
+        return (bitboard >> -amount) & mask
+
+
+def popcount(bitboard: int) -> int:
+    """
+    Return the number of squares set in the bitboard.
+    """
+    return bin(bitboard).count('1')
+
+
+def legal_moves(own: int, opp: int) -> int:
+    """
+    Return a bitboard of all legal moves for the player owning the pieces in own.
+    """
+    empty = ~(own | opp) & FULL
+    moves = 0
+    # The shifts are written out instead of calling shift, since this is the hottest code of the
+    # computer players. All masks fit in 64 bits, so they also remove the bits shifted off the
+    # board.
+    for amount, mask in UP_DIRECTIONS:
+        # Opponent pieces which are adjacent to one of our pieces in this direction
+        candidates = (own >> amount) & mask & opp
+        # An uninterrupted line of opponent pieces is at most 6 long
+        for _ in range(5):
+            candidates |= (candidates >> amount) & mask & opp
+        moves |= (candidates >> amount) & mask & empty
+    for amount, mask in DOWN_DIRECTIONS:
+        candidates = (own << amount) & mask & opp
+        for _ in range(5):
+            candidates |= (candidates << amount) & mask & opp
+        moves |= (candidates << amount) & mask & empty
+
+    return moves
+
+
+def flips(own: int, opp: int, square: int) -> int:
+    """
+    Return a bitboard of the opponent pieces captured by playing on square.
+    """
+    flipped = 0
+    move = 1 << square
+    for amount, mask in UP_DIRECTIONS:
+        line = 0
+        current = (move >> amount) & mask
+        while current & opp:
+            line |= current
+            current = (current >> amount) & mask
+        if current & own:
+            flipped |= line
+    for amount, mask in DOWN_DIRECTIONS:
+        line = 0
+        current = (move << amount) & mask
+        while current & opp:
+            line |= current
+            current = (current << amount) & mask
+        if current & own:
+            flipped |= line
+
+    return flipped
+
+
+def squares(bitboard: int) -> list:
+    """
+    Return the list of squares (bit indices) set in the bitboard.
+    """
+    result = []
+    while bitboard:
+        lowest = bitboard & -bitboard
+        result.append(lowest.bit_length() - 1)
+        bitboard ^= lowest
+    return result
+
+
+# The four lines through a square (horizontal, vertical and the two diagonals), each as a pair of
+# opposite directions (shift, mask), like DIRECTIONS
+AXES = [((1, NOT_COL_0), (-1, NOT_COL_7)),
+        ((8, FULL), (-8, FULL)),
+        ((9, NOT_COL_0), (-9, NOT_COL_7)),
+        ((7, NOT_COL_7), (-7, NOT_COL_0))]
+
+# The squares of every full line of the board along each axis
+AXIS_LINES = [[sum(1 << (y * 8 + x) for x in range(0, 8)) for y in range(0, 8)],
+              [sum(1 << (y * 8 + x) for y in range(0, 8)) for x in range(0, 8)],
+              [sum(1 << (y * 8 + x) for y in range(0, 8) for x in range(0, 8) if x - y == d)
+               for d in range(-7, 8)],
+              [sum(1 << (y * 8 + x) for y in range(0, 8) for x in range(0, 8) if x + y == d)
+               for d in range(0, 15)]]
+
+# For each axis, the squares with no neighbour in its first and in its second direction
+AXIS_EDGES = [(FULL & ~shift(FULL, second[0], second[1]), FULL & ~shift(FULL, first[0], first[1]))
+              for first, second in AXES]
+
+CORNERS = (1 << 0) | (1 << 7) | (1 << 56) | (1 << 63)
+
+
+def stable_pieces(own: int, opp: int, known: int = 0) -> int:
+    """
+    Return a bitboard of pieces in own which can never be captured.
+
+    A piece is stable if, along each of the four lines through it, the line is full or one of its
+    neighbours is the edge of the board or another stable piece of the same color. Not every
+    stable piece is found, but every piece found is stable.
+
+    known is a bitboard of pieces of own already known to be stable (e.g. found in an earlier
+    position of the same game, since stable pieces stay stable), from which the search starts.
+
+    Preconditions:
+        - known & ~own == 0
+    """
+    filled = own | opp
+    full_lines = []
+    for lines in AXIS_LINES:
+        full = 0
+        for line in lines:
+            if filled & line == line:
+                full |= line
+        full_lines.append(full)
+
+    stable = own & CORNERS | known
+    if stable == 0:
+        return 0
+
+    while True:
+        new_stable = own
+        for (first, second), (first_edge, second_edge), full in zip(AXES, AXIS_EDGES, full_lines):
+            # Squares whose neighbour in the first direction is stable, and in the second direction
+            toward_first = shift(stable, second[0], second[1]) | first_edge
+            toward_second = shift(stable, first[0], first[1]) | second_edge
+            new_stable &= full | toward_first | toward_second
+        new_stable |= known
+
+        if new_stable == stable:
+            return stable
+        stable = new_stable
+
+
+def to_moves(bitboard: int) -> set:
+    """
+    Return the squares set in the bitboard as a set of (row, column) tuples.
+    """
+    return {(square >> 3, square & 7) for square in squares(bitboard)}
+
+
+def zobrist_hash(white: int, black: int, is_white_move: bool) -> int:
+    """
+    Return the Zobrist hash of the position with the given bitboards and side to move.
+    """
+    key = ZOBRIST_WHITE_MOVE if is_white_move else 0
+    for square in squares(white):
+        key ^= ZOBRIST_WHITE[square]
+    for square in squares(black):
+        key ^= ZOBRIST_BLACK[square]
+    return key
+
+
+def zobrist_update(key: int, is_white: bool, square: int, flipped: int) -> int:
+    """
+    Return the Zobrist hash key after the player (white if is_white) puts a piece on square and
+    captures the pieces in flipped. The side to move changes as well.
+    """
+    key ^= ZOBRIST_WHITE_MOVE ^ (ZOBRIST_WHITE[square] if is_white else ZOBRIST_BLACK[square])
+    for captured in squares(flipped):
+        key ^= ZOBRIST_FLIP[captured]
+    return key
+
+
+def to_gameboard(white: int, black: int) -> list:
+    """
+    Return the 8x8 list gameboard (1 = white, -1 = black, 0 = empty) of the two bitboards.
+    """
+    return [[1 if white >> (i * 8 + j) & 1 else -1 if black >> (i * 8 + j) & 1 else 0
+             for j in range(0, 8)] for i in range(0, 8)]
+
+
+def from_gameboard(gameboard: list) -> tuple:
+    """
+    Return the (white, black) bitboards of an 8x8 list gameboard.
+    """
+    white, black = 0, 0
+    for i in range(0, 8):
+        for j in range(0, 8):
+            if gameboard[i][j] == 1:
+                white |= 1 << (i * 8 + j)
+            elif gameboard[i][j] == -1:
+                black |= 1 << (i * 8 + j)
+    return (white, black)
+
+
+####################################################################################
+# Compact positions
+####################################################################################
+class Position:
+    """
+    A compact, immutable game state: the two bitboards, the side to move and the previous move.
+
+    Positions are used where many game states are kept at once (e.g. in every node of a GameTree).
+    Othello.to_position/from_position and BitboardOthello.to_position/from_position convert
+    between positions and games without losing anything but the history of moves to undo.
+
+    Instance Attributes:
+        - white: the bitboard of the white pieces
+        - black: the bitboard of the black pieces
+        - is_white_move: whether it is white's turn to move
+        - previous_move: the previous move of the game
+        - zobrist: the Zobrist hash of the pieces and the side to move
+    """
+    __slots__ = ('white', 'black', 'is_white_move', 'previous_move', 'zobrist')
+    white: int
+    black: int
+    is_white_move: bool
+    previous_move: tuple
+    zobrist: int
+
+    def __init__(self, white: int, black: int, is_white_move: bool, previous_move: tuple,
+                 zobrist: Any = None) -> None:
+        """
+        Initialize a position. The Zobrist hash is calculated if it is not given.
+        """
+        if zobrist is None:
+            zobrist = zobrist_hash(white, black, is_white_move)
+        object.__setattr__(self, 'white', white)
+        object.__setattr__(self, 'black', black)
+        object.__setattr__(self, 'is_white_move', is_white_move)
+        object.__setattr__(self, 'previous_move', previous_move)
+        object.__setattr__(self, 'zobrist', zobrist)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('Position is immutable')
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Position) and \
+            (self.white, self.black, self.is_white_move, self.previous_move) == \
+            (other.white, other.black, other.is_white_move, other.previous_move)
+
+    def __hash__(self) -> int:
+        return hash((self.zobrist, self.previous_move))
+
+    def __reduce__(self) -> tuple:
+        return (Position, (self.white, self.black, self.is_white_move, self.previous_move,
+                           self.zobrist))
+
+    def __repr__(self) -> str:
+        return f'Position({self.white:#x}, {self.black:#x}, {self.is_white_move}, ' \
+               f'{self.previous_move})'
+
+    def score(self) -> tuple:
+        """
+        Return the score in a tuple: (Number of White pieces: Number of Black pieces)
+        """
+        return (popcount(self.white), popcount(self.black))
+
+
+####################################################################################
+# Othello on bitboards
+####################################################################################
+class BitboardOthello:
+    """
+    All the functions related to Othello, using two bitboards to store the pieces.
+
+    The public interface is the same as Othello_Game.Othello. gameboard is rebuilt from the
+    bitboards on every access, so it must only be read, not modified.
+
+    Instance Attributes:
+        - white: the bitboard of the white pieces
+        - black: the bitboard of the black pieces
+        - is_white_move: whether it is white's turn to move
+        - previous_move: the previous move of the game. Default value is ('START', 'START').
+        - zobrist: the Zobrist hash of the current position, kept up to date by make_move
+    """
+    # Private Instance Attributes:
+    #   - _valid_moves: the cached legal moves bitboard for each color on the current board.
+    #                   It is cleared whenever the board changes.
+    #   - _history: the undo records of the moves played with make_move, the last move at the end.
+    #               A record is (previous_move, is_white_move, square, flipped, valid_moves,
+    #               zobrist), the state before the move; square is None for a pass.
+    white: int
+    black: int
+    is_white_move: bool
+    previous_move: tuple
+    zobrist: int
+    _valid_moves: dict
+    _history: list
+
+    def __init__(self) -> None:
+        self.white = (1 << 27) | (1 << 36)
+        self.black = (1 << 28) | (1 << 35)
+
+        self.is_white_move = False
+        self.previous_move = ('START', 'START')
+        self.zobrist = zobrist_hash(self.white, self.black, self.is_white_move)
+
+        self._valid_moves = {}
+        self._history = []
+
+    def copy(self) -> BitboardOthello:
+        """
+        Return a copy of the current game state, without the history of moves to undo.
+        """
+        game = BitboardOthello.__new__(BitboardOthello)
+        game.white = self.white
+        game.black = self.black
+        game.is_white_move = self.is_white_move
+        game.previous_move = self.previous_move
+        game.zobrist = self.zobrist
+        game._valid_moves = dict(self._valid_moves)
+        game._history = []
+        return game
+
+    def to_position(self) -> Position:
+        """
+        Return the current game state as a Position.
+        """
+        return Position(self.white, self.black, self.is_white_move, self.previous_move,
+                        self.zobrist)
+
+    @classmethod
+    def from_position(cls, position: Position) -> BitboardOthello:
+        """
+        Return a new game in the state given by position.
+        """
+        game = cls()
+        game.white = position.white
+        game.black = position.black
+        game.is_white_move = position.is_white_move
+        game.previous_move = position.previous_move
+        game.zobrist = position.zobrist
+        return game
+
+    @property
+    def gameboard(self) -> list:
+        """
+        Return the current state of the board as an 8x8 list (1 = white, -1 = black, 0 = empty).
+        """
+        return to_gameboard(self.white, self.black)
+
+    def draw_game_state(self, screen: Any, pos_size: tuple) -> None:
+        """
+        Draw the current state of the game board.
+        """
+        from Othello_Game import Othello
+        Othello.draw_game_state(self, screen, pos_size)
+
+    def get_valid_moves_now(self) -> list:
+        """
+        Return all valid moves for the current player.
+        """
+        if self.is_white_move:
+            return list(self.get_valid_moves_white())
+        else:
+            return list(self.get_valid_moves_black())
+
+    def pass_turn(self) -> None:
+        """
+        If there are no valid moves for current player, pass turn to other player.
+        """
+        if self.get_valid_moves_now() == []:
+            self.is_white_move = not self.is_white_move
+
+    def make_move(self, y: Any, x: Any) -> Any:
+        """
+        Make move for the current color, and return the number of pieces captured
+        """
+        # If the current player has no valid moves (this is also the case when there is a
+        # winner), pass the turn.
+        if self.get_move_bitboard(self.is_white_move) == 0:
+            self._history.append((self.previous_move, self.is_white_move, None, 0, None,
+                                  self.zobrist))
+            self.is_white_move = not self.is_white_move
+            self.zobrist ^= ZOBRIST_WHITE_MOVE
+            self.previous_move = ('', '')
+            return -99
+
+        if self.is_white_move:
+            own, opp = self.white, self.black
+        else:
+            own, opp = self.black, self.white
+
+        # Only valid moves will be played. If move is not valid, gameboard will not change.
+        if not (isinstance(y, int) and isinstance(x, int) and 0 <= y < 8 and 0 <= x < 8):
+            return False
+        square = y * 8 + x
+        if not self.get_move_bitboard(self.is_white_move) >> square & 1:
+            return False
+
+        flipped = flips(own, opp, square)
+        self._history.append((self.previous_move, self.is_white_move, square, flipped,
+                              self._valid_moves, self.zobrist))
+        self.zobrist = zobrist_update(self.zobrist, self.is_white_move, square, flipped)
+        own |= flipped | (1 << square)
+        opp &= ~flipped
+
+        if self.is_white_move:
+            self.white, self.black = own, opp
+        else:
+            self.black, self.white = own, opp
+        self._valid_moves = {}
+
+        self.is_white_move = not self.is_white_move
+        self.previous_move = (y, x)
+        return popcount(flipped)
+
+    def undo_move(self) -> Any:
+        """
+        Take back the last move played with make_move, restoring the previous game state exactly,
+        and return that move (('', '') for a pass).
+
+        Preconditions:
+            - at least one move has been played with make_move since this game was created
+        """
+        previous_move, is_white_move, square, flipped, valid_moves, zobrist = self._history.pop()
+        self.is_white_move = is_white_move
+        self.previous_move = previous_move
+        self.zobrist = zobrist
+
+        if square is None:
+            return ('', '')
+
+        if is_white_move:
+            self.white ^= flipped | (1 << square)
+            self.black |= flipped
+        else:
+            self.black ^= flipped | (1 << square)
+            self.white |= flipped
+
+        self._valid_moves = valid_moves
+        return (square >> 3, square & 7)
+
+    def score(self) -> tuple:
+        """
+        Return the current score in a tuple: (Number of White pieces: Number of Black pieces)
+        """
+        return (popcount(self.white), popcount(self.black))
+
+    def get_winner(self) -> int:
+        """
+        Return the winner of the game as a number
+
+        if value returned is 1, it means white wins.
+        if value returned is -1, it means black wins.
+        if value returned is 0, it means it is a draw.
+        If value returned is -100, it means no winner is declared yet.
+        """
+        if self.full() or (self.get_move_bitboard(True) == 0 == self.get_move_bitboard(False)):
+            w, b = self.score()
+            if w == b:
+                return 0
+            elif w > b:
+                return 1
+            else:
+                return -1
+        else:
+            return -100
+
+    def full(self) -> bool:
+        """
+        Check if the board has been fully filled.
+        """
+        return self.white | self.black == FULL
+
+    def print(self) -> Any:
+        """
+        Print the current state of the board in the console using pprint.
+        """
+        import pprint
+        pprint.pprint(self.gameboard)
+
+    #####################################################################
+    # Helper functions
+    #####################################################################
+    def get_valid_moves_white(self) -> set:
+        """
+        Get valid moves for white
+        """
+        return to_moves(self.get_move_bitboard(True))
+
+    def get_valid_moves_black(self) -> set:
+        """
+        Get valid moves for black
+        """
+        return to_moves(self.get_move_bitboard(False))
+
+    def get_move_bitboard(self, is_white: bool) -> int:
+        """
+        Return the bitboard of the legal moves for white (is_white) or black.
+
+        The result is cached until the board changes.
+        """
+        if is_white not in self._valid_moves:
+            if is_white:
+                self._valid_moves[is_white] = legal_moves(self.white, self.black)
+            else:
+                self._valid_moves[is_white] = legal_moves(self.black, self.white)
+
+        return self._valid_moves[is_white]
+
+
+# Testing
+if __name__ == '__main__':
+    gg = BitboardOthello()
@@ -0,0 +1,242 @@
+"""
+Objective: This file contains the endgame solver used by the computer players once only a few
+           empty squares are left. Instead of scoring positions with the heuristic evaluation, it
+           searches every line to the end of the game and finds the move with the best final
+           difference in pieces, which is provably the best move.
+
+           The solver works directly on bitboards (see Bitboard_Game) and uses:
+           - a list of the empty squares, instead of looking for them on the board
+           - parity ordering: moves in regions of the board with an odd number of empty squares
+             are searched first, since the player who moves last in a region usually gains there
+           - fastest-first ordering far from the end: moves leaving the opponent the fewest
+             replies are searched first
+           - stability cutoffs: pieces that can never be captured bound the best possible result
+           - its own small transposition table
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+import math
+from typing import Any
+
+from Bitboard_Game import BitboardOthello, ZOBRIST_WHITE_MOVE, flips, legal_moves, popcount, \
+    stable_pieces, zobrist_update
+from Evaluation_AI import BOARD_SCORE
+from Transposition_AI import EXACT, LOWER, UPPER, TranspositionTable
+
+# The quadrant of each square, for parity ordering
+REGION = [(square >> 5) * 2 + ((square & 7) >> 2) for square in range(0, 64)]
+
+# The squares, from the most to the least valuable according to BOARD_SCORE
+SQUARE_ORDER = sorted(range(0, 64), key=lambda square: -BOARD_SCORE[square >> 3][square & 7])
+
+# Positions with fewer empty squares than this are not stored in the transposition table, since
+# solving them again is about as fast as looking them up
+TABLE_MIN_EMPTIES = 6
+
+# Stable pieces are only counted in positions with at least this many empty squares
+STABILITY_MIN_EMPTIES = 6
+
+# Moves are sorted by the number of replies they leave (fastest-first) in positions with at
+# least this many empty squares; closer to the end, only parity ordering is used, and the moves
+# are found by trying every empty square instead of computing all legal moves
+FASTEST_MIN_EMPTIES = 7
+
+
+class EndgameSolver:
+    """
+    An exact endgame solver.
+
+    Scores are the final difference in pieces (the player's pieces minus the opponent's, with
+    empty squares left at the end of the game counted for nobody). Inside the solver they are
+    from the point of view of the player to move; solve returns them from white's point of view.
+
+    Instance Attributes:
+        - table: the transposition table of the solver, shared by all of its searches
+        - nodes: the number of positions visited by the last search
+    """
+    table: TranspositionTable
+    nodes: int
+
+    def __init__(self, table_size: int = 1 << 14) -> None:
+        self.table = TranspositionTable(table_size)
+        self.nodes = 0
+
+    def solve(self, game: Any, exact: bool = True) -> tuple:
+        """
+        Return the best move for the player to move in game and the final difference in pieces
+        (from white's point of view) after perfect play by both players.
+
+        If exact is False, only whether the game is won, drawn or lost is found (which is
+        faster): the score is then only positive, zero or negative. The best move is ('', '') if
+        the player to move has to pass. game is not changed.
+        """
+        board = BitboardOthello.from_position(game.to_position())
+        if board.is_white_move:
+            own, opp = board.white, board.black
+        else:
+            own, opp = board.black, board.white
+
+        empties = [square for square in SQUARE_ORDER if not (own | opp) >> square & 1]
+        self.nodes = 0
+        self.table.new_search()
+
+        moves = legal_moves(own, opp)
+        if moves == 0:
+            score = self._solve(own, opp, empties, board.zobrist, board.is_white_move, -64, 64,
+                                False)
+            move = ('', '')
+        else:
+            a, b = (-64, 64) if exact else (-1, 1)
+            score = -math.inf
+            best = None
+            for square, flipped in self._order_fastest(own, opp, empties, None):
+                rest = [empty for empty in empties if empty != square]
+                key = zobrist_update(board.zobrist, board.is_white_move, square, flipped)
+                result = -self._solve(opp & ~flipped, own | flipped | (1 << square), rest, key,
+                                      not board.is_white_move, -b, -a, False)
+                if result > score:
+                    score = result
+                    best = square
+                    a = max(a, score)
+                    if a >= b:
+                        break
+            move = (best >> 3, best & 7)
+
+        if board.is_white_move:
+            return (move, score)
+        else:
+            return (move, -score)
+
+    def _solve(self, own: int, opp: int, empties: list, key: int, is_white: bool, a: float,
+               b: float, passed: bool) -> float:
+        """
+        Return the final difference in pieces after perfect play from the position where the
+        player to move (white if is_white) owns own, with alpha-beta window (a, b). key is the
+        Zobrist hash of the position and empties the list of its empty squares. passed is whether
+        the other player has just passed.
+        """
+        self.nodes += 1
+        n_empties = len(empties)
+        if n_empties == 0:
+            return popcount(own) - popcount(opp)
+
+        a_start = a
+        table_move = None
+        if n_empties >= TABLE_MIN_EMPTIES:
+            entry = self.table.lookup(key)
+            if entry is not None:
+                if entry.cutoff(n_empties, a, b):
+                    return entry.score
+                table_move = entry.best_move
+
+        # The opponent's stable pieces will still be theirs at the end of the game. Even if all of
+        # the opponent's pieces were stable, a cutoff needs 64 - 2 * (opponent pieces) <= a.
+        if n_empties >= STABILITY_MIN_EMPTIES and 64 - 2 * popcount(opp) <= a:
+            best_possible = 64 - 2 * popcount(stable_pieces(opp, own))
+            if best_possible <= a:
+                return best_possible
+
+        if n_empties >= FASTEST_MIN_EMPTIES:
+            candidates = self._order_fastest(own, opp, empties, table_move)
+        else:
+            candidates = self._order(own, opp, empties, table_move)
+
+        best_score = -math.inf
+        best_square = None
+        for square, flipped in candidates:
+            if flipped == 0:
+                continue
+            rest = [empty for empty in empties if empty != square]
+            score = -self._solve(opp & ~flipped, own | flipped | (1 << square), rest,
+                                 zobrist_update(key, is_white, square, flipped), not is_white,
+                                 -b, -a, False)
+            if score > best_score:
+                best_score = score
+                best_square = square
+                if score > a:
+                    a = score
+                    if a >= b:
+                        break
+
+        if best_square is None:
+            # The game is over if neither player can move
+            if passed:
+                return popcount(own) - popcount(opp)
+            return -self._solve(opp, own, empties, key ^ ZOBRIST_WHITE_MOVE, not is_white, -b, -a,
+                                True)
+
+        if n_empties >= TABLE_MIN_EMPTIES:
+            if best_score <= a_start:
+                bound = UPPER
+            elif best_score >= b:
+                bound = LOWER
+            else:
+                bound = EXACT
+            self.table.store(key, n_empties, best_score, bound, best_square)
+
+        return best_score
+
+    def _order(self, own: int, opp: int, empties: list, table_move: Any) -> list:
+        """
+        Return (square, flipped) for every square of empties, in the order to search them: the
+        best move from the transposition table first, then the squares in regions with an odd
+        number of empty squares, each group in the order of empties.
+
+        flipped is the bitboard of the pieces captured by playing on square, which is 0 if the
+        move is not legal.
+        """
+        parity = [0, 0, 0, 0]
+        for square in empties:
+            parity[REGION[square]] ^= 1
+
+        first = []
+        odd = []
+        even = []
+        for square in empties:
+            if square == table_move:
+                first.append((square, flips(own, opp, square)))
+            elif parity[REGION[square]]:
+                odd.append((square, flips(own, opp, square)))
+            else:
+                even.append((square, flips(own, opp, square)))
+
+        return first + odd + even
+
+    def _order_fastest(self, own: int, opp: int, empties: list, table_move: Any) -> list:
+        """
+        Return (square, flipped) for every legal move, in the order to search them: the best move
+        from the transposition table first, then the moves which leave the opponent the fewest
+        replies, with ties in the order of _order.
+        """
+        moves = legal_moves(own, opp)
+        keyed = []
+        for square, flipped in self._order(own, opp, empties, table_move):
+            if moves >> square & 1:
+                if square == table_move:
+                    replies = -1
+                else:
+                    new_own = own | flipped | (1 << square)
+                    replies = popcount(legal_moves(opp & ~flipped, new_own))
+                keyed.append((replies, len(keyed), square, flipped))
+
+        keyed.sort()
+        return [(square, flipped) for _, _, square, flipped in keyed]
+
+
+# Testing
+if __name__ == '__main__':
+    import random
+    import time
+
+    random.seed(2021)
+    test_game = BitboardOthello()
+    while 64 - sum(test_game.score()) > 14 and test_game.get_winner() == -100:
+        valid_moves = test_game.get_valid_moves_now()
+        if valid_moves == []:
+            test_game.make_move(-1, -1)
+        else:
+            test_game.make_move(*random.choice(valid_moves))
+
+    solver = EndgameSolver()
+    start = time.time()
+    print(solver.solve(test_game), solver.nodes, time.time() - start)
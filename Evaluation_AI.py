@@ -0,0 +1,364 @@
+"""
+Objective: This file contains the evaluation used by the computer players to score Othello
+           positions at the leaves of their searches.
+
+           Scores are from white's point of view: a more positive score indicates a more
+           advantageous position for white; a more negative score indicates a more advantageous
+           position for black.
+
+           There are three evaluations:
+           - leaf_score, used by GameTree: the difference in pieces and the value of the square
+             of the last move
+           - evaluate: the difference in pieces, the values of all the squares, mobility (the
+             number of valid moves) and frontier pieces (pieces next to an empty square). The
+             same evaluation is computed by evaluate_batch with NumPy for many positions at once.
+           - evaluate_features: the features of evaluate, plus stable pieces (pieces which can
+             never be captured), for a FeatureBoard, which keeps the values of the squares and
+             the stable pieces up to date as moves are made and undone
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import numpy as np
+
+from Bitboard_Game import BitboardOthello, DIRECTIONS, FULL, Position, legal_moves, popcount, \
+    squares, stable_pieces
+
+# Score given to the Othello board
+# Higher scores indicate more valuable positions, while negative scores indicate
+# disadvantageous positions
+BOARD_SCORE = [[120, -20, 20, 5, 5, 20, -20, 120],
+               [-20, -40, -5, -5, -5, -5, -40, -20],
+               [20, -5, 15, 3, 3, 15, -5, 20],
+               [5, -5, 3, 3, 3, 3, -5, 5],
+               [5, -5, 3, 3, 3, 3, -5, 5],
+               [20, -5, 15, 3, 3, 15, -5, 20],
+               [-20, -40, -5, -5, -5, -5, -40, -20],
+               [120, -20, 20, 5, 5, 20, -20, 120]]
+
+# Score of a finished game won by white
+WIN_SCORE = 10000
+
+# Weights of the features of evaluate
+MATERIAL_WEIGHT = 0.75
+SQUARE_WEIGHT = 0.25
+MOBILITY_WEIGHT = 2.0
+FRONTIER_WEIGHT = -1.0
+# Weight of the difference in stable pieces, only used by evaluate_features
+STABILITY_WEIGHT = 4.0
+
+# BOARD_SCORE by square (bit index), for bitboards
+SQUARE_SCORE = [BOARD_SCORE[square >> 3][square & 7] for square in range(0, 64)]
+
+
+def end_score(white_count: int, black_count: int) -> float:
+    """
+    Return the score of a finished game with the given number of white and black pieces.
+    """
+    if white_count > black_count:
+        return WIN_SCORE
+    elif white_count < black_count:
+        return -WIN_SCORE
+    else:
+        return 0
+
+
+def leaf_score(move: Any, is_white_move: bool, white_count: int, black_count: int) -> float:
+    """
+    Return the score of a leaf of a search: the position after move was played, with
+    is_white_move telling whose turn it is now.
+
+    The score of a normal move is mostly the difference in pieces, plus a bonus (or a penalty)
+    for the player who made the move according to BOARD_SCORE.
+    """
+    # Case 1a: the leaf is the end of the game
+    if move == ('GG', 'GG'):
+        return end_score(white_count, black_count)
+
+    # Case 1b: the leaf is the beginning of the game
+    elif move == ('START', 'START'):
+        return 0
+
+    # Case 1c: the leaf is a pass-your-turn move
+    elif move == ('', ''):
+        if is_white_move:
+            return 100
+        else:
+            return -100
+
+    # Case 1d: the leaf is a normal move
+    elif is_white_move:
+        return (white_count - black_count) * 0.75 + BOARD_SCORE[move[0]][move[1]] * -0.25
+    else:
+        return (white_count - black_count) * 0.75 + BOARD_SCORE[move[0]][move[1]] * 0.25
+
+
+def evaluate(white: int, black: int) -> float:
+    """
+    Return the score of the position with the given bitboards, according to the difference in
+    pieces, the values of their squares, mobility and frontier pieces. A finished game (neither
+    player can move) is scored with end_score.
+    """
+    white_moves = popcount(legal_moves(white, black))
+    black_moves = popcount(legal_moves(black, white))
+    white_count, black_count = popcount(white), popcount(black)
+    if white_moves == 0 and black_moves == 0:
+        return end_score(white_count, black_count)
+
+    next_to_empty = _next_to_empty(white | black)
+    return MATERIAL_WEIGHT * (white_count - black_count) \
+        + SQUARE_WEIGHT * squares_score(white, black) \
+        + MOBILITY_WEIGHT * (white_moves - black_moves) \
+        + FRONTIER_WEIGHT * (popcount(white & next_to_empty) - popcount(black & next_to_empty))
+
+
+def squares_score(white: int, black: int) -> int:
+    """
+    Return the sum of SQUARE_SCORE over the white pieces minus the sum over the black pieces.
+    """
+    return sum(SQUARE_SCORE[square] for square in squares(white)) \
+        - sum(SQUARE_SCORE[square] for square in squares(black))
+
+
+def _next_to_empty(filled: int) -> int:
+    """
+    Return the bitboard of the squares next to an empty square, where filled is the bitboard of
+    all the pieces.
+    """
+    empty = ~filled & FULL
+    next_to_empty = 0
+    for amount, mask in DIRECTIONS:
+        if amount > 0:
+            next_to_empty |= (empty << amount) & mask & FULL
+        else:
+            next_to_empty |= (empty >> -amount) & mask
+    return next_to_empty
+
+
+####################################################################################
+# Incremental evaluation
+####################################################################################
+class FeatureBoard(BitboardOthello):
+    """
+    A BitboardOthello which keeps the features of evaluate_features up to date as moves are made
+    and undone, so that scoring a position at the leaf of a search needs little work.
+
+    Instance Attributes:
+        - squares_score: the sum of SQUARE_SCORE over the white pieces minus the sum over the
+                         black pieces (see squares_score), updated by make_move from the squares
+                         which changed
+    """
+    # Private Instance Attributes:
+    #   - _stable: the (white, black) bitboards of the stable pieces of the current position, or
+    #              None if they have not been computed yet
+    #   - _known_stable: (white, black) bitboards of pieces known to be stable in the current
+    #                    position: the stable pieces of the last position they were computed for
+    #   - _feature_history: (squares_score, _stable, _known_stable) before each move of _history
+    squares_score: int
+    _stable: Optional[tuple]
+    _known_stable: tuple
+    _feature_history: list
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.squares_score = squares_score(self.white, self.black)
+        self._stable = None
+        self._known_stable = (0, 0)
+        self._feature_history = []
+
+    def copy(self) -> FeatureBoard:
+        """
+        Return a copy of the current game state, without the history of moves to undo.
+        """
+        game = FeatureBoard.from_position(self.to_position())
+        game._stable = self._stable
+        game._known_stable = self._known_stable
+        return game
+
+    @classmethod
+    def from_position(cls, position: Position) -> FeatureBoard:
+        """
+        Return a new game in the state given by position.
+        """
+        game = super().from_position(position)
+        game.squares_score = squares_score(game.white, game.black)
+        return game
+
+    def make_move(self, y: Any, x: Any) -> Any:
+        """
+        Make move for the current color, and return the number of pieces captured
+        """
+        is_white_move = self.is_white_move
+        record = (self.squares_score, self._stable, self._known_stable)
+        result = super().make_move(y, x)
+        if result is False:
+            return result
+
+        self._feature_history.append(record)
+        square, flipped = self._history[-1][2:4]
+        if square is not None:
+            # The placed piece is added for the player, and each flipped piece moves from the
+            # opponent to the player
+            change = SQUARE_SCORE[square] + 2 * sum(SQUARE_SCORE[s] for s in squares(flipped))
+            self.squares_score += change if is_white_move else -change
+
+            # Pieces stay stable, so the stable pieces of this position are found starting from
+            # those of the previous one
+            if self._stable is not None:
+                self._known_stable = self._stable
+            self._stable = None
+        return result
+
+    def undo_move(self) -> Any:
+        """
+        Take back the last move played with make_move, restoring the previous game state exactly,
+        and return that move (('', '') for a pass).
+
+        Preconditions:
+            - at least one move has been played with make_move since this game was created
+        """
+        move = super().undo_move()
+        self.squares_score, self._stable, self._known_stable = self._feature_history.pop()
+        return move
+
+    def stable(self) -> tuple:
+        """
+        Return the (white, black) bitboards of the stable pieces (see
+        Bitboard_Game.stable_pieces) of the current position.
+        """
+        if self._stable is None:
+            known_white, known_black = self._known_stable
+            self._stable = (stable_pieces(self.white, self.black, known_white),
+                            stable_pieces(self.black, self.white, known_black))
+        return self._stable
+
+
+def evaluate_features(board: FeatureBoard) -> float:
+    """
+    Return the score of the current position of board: the score of evaluate, plus the
+    difference in stable pieces. A finished game is scored with end_score.
+
+    The values of the squares and the stable pieces come from board instead of being computed
+    from scratch, and the valid moves from its cache.
+    """
+    white, black = board.white, board.black
+    white_moves = popcount(board.get_move_bitboard(True))
+    black_moves = popcount(board.get_move_bitboard(False))
+    white_count, black_count = popcount(white), popcount(black)
+    if white_moves == 0 and black_moves == 0:
+        return end_score(white_count, black_count)
+
+    next_to_empty = _next_to_empty(white | black)
+    white_stable, black_stable = board.stable()
+    return MATERIAL_WEIGHT * (white_count - black_count) \
+        + SQUARE_WEIGHT * board.squares_score \
+        + MOBILITY_WEIGHT * (white_moves - black_moves) \
+        + FRONTIER_WEIGHT * (popcount(white & next_to_empty) - popcount(black & next_to_empty)) \
+        + STABILITY_WEIGHT * (popcount(white_stable) - popcount(black_stable))
+
+
+####################################################################################
+# Batch evaluation with NumPy
+####################################################################################
+# The directions, split by the direction of the shift, as columns of amounts and masks so that
+# the shifts in all directions are done by one NumPy call
+_UP_AMOUNTS = np.array([[amount] for amount, _ in DIRECTIONS if amount > 0], dtype=np.uint64)
+_UP_MASKS = np.array([[mask] for amount, mask in DIRECTIONS if amount > 0], dtype=np.uint64)
+_DOWN_AMOUNTS = np.array([[-amount] for amount, _ in DIRECTIONS if amount < 0], dtype=np.uint64)
+_DOWN_MASKS = np.array([[mask] for amount, mask in DIRECTIONS if amount < 0], dtype=np.uint64)
+_BITS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+_SQUARE_SCORE = np.array(SQUARE_SCORE, dtype=np.float64)
+
+
+def _neighbours(bitboards: np.ndarray) -> tuple:
+    """
+    Return the bitboards shifted in each direction, as two (4, N) arrays: the directions towards
+    higher bits and towards lower bits.
+    """
+    return ((bitboards << _UP_AMOUNTS) & _UP_MASKS, (bitboards >> _DOWN_AMOUNTS) & _DOWN_MASKS)
+
+
+def _legal_moves(own: np.ndarray, opp: np.ndarray) -> np.ndarray:
+    """
+    Return the bitboards of the legal moves of each position, like Bitboard_Game.legal_moves.
+
+    The lines of opponent pieces are found by doubling the shift (1, 2, then 4 squares) instead
+    of shifting one square at a time, which needs fewer NumPy calls.
+    """
+    empty = ~(own | opp)
+    # Pieces of own, and opponent pieces in a line from them; propagate marks the opponent
+    # pieces which can be reached from the previous square without wrapping around the board
+    up, propagate = own, opp & _UP_MASKS
+    up = up | (propagate & (up << _UP_AMOUNTS))
+    propagate = propagate & (propagate << _UP_AMOUNTS)
+    up = up | (propagate & (up << (_UP_AMOUNTS * np.uint64(2))))
+    propagate = propagate & (propagate << (_UP_AMOUNTS * np.uint64(2)))
+    up = up | (propagate & (up << (_UP_AMOUNTS * np.uint64(4))))
+
+    down, propagate = own, opp & _DOWN_MASKS
+    down = down | (propagate & (down >> _DOWN_AMOUNTS))
+    propagate = propagate & (propagate >> _DOWN_AMOUNTS)
+    down = down | (propagate & (down >> (_DOWN_AMOUNTS * np.uint64(2))))
+    propagate = propagate & (propagate >> (_DOWN_AMOUNTS * np.uint64(2)))
+    down = down | (propagate & (down >> (_DOWN_AMOUNTS * np.uint64(4))))
+
+    moves = ((up & opp) << _UP_AMOUNTS) & _UP_MASKS | ((down & opp) >> _DOWN_AMOUNTS) & _DOWN_MASKS
+    return np.bitwise_or.reduce(moves, axis=0) & empty
+
+
+def _popcount(bitboards: np.ndarray) -> np.ndarray:
+    """
+    Return the number of squares set in each bitboard.
+    """
+    return np.bitwise_count(bitboards).astype(np.int64)
+
+
+def to_bitboards(boards: np.ndarray) -> np.ndarray:
+    """
+    Return the (N, 2) uint64 array of the (white, black) bitboards of an (N, 8, 8) array of
+    gameboards (1 = white, -1 = black, 0 = empty).
+    """
+    flat = boards.reshape(len(boards), 64)
+    white = np.where(flat == 1, _BITS, np.uint64(0)).sum(axis=1, dtype=np.uint64)
+    black = np.where(flat == -1, _BITS, np.uint64(0)).sum(axis=1, dtype=np.uint64)
+    return np.stack([white, black], axis=1)
+
+
+def evaluate_batch(boards: np.ndarray) -> np.ndarray:
+    """
+    Return the scores (see evaluate) of many positions at once.
+
+    boards is either an (N, 8, 8) int8 array of gameboards (1 = white, -1 = black, 0 = empty) or
+    an (N, 2) uint64 array of (white, black) bitboards.
+    """
+    if boards.ndim == 3:
+        boards = to_bitboards(boards)
+    n = len(boards)
+    white = boards[:, 0].astype(np.uint64)
+    black = boards[:, 1].astype(np.uint64)
+
+    # The moves of both players are computed together, to halve the number of NumPy calls
+    both = np.concatenate([white, black])
+    moves = _popcount(_legal_moves(both, np.concatenate([black, white])))
+    white_moves, black_moves = moves[:n], moves[n:]
+    white_count, black_count = _popcount(white), _popcount(black)
+
+    empty = ~(white | black)
+    up, down = _neighbours(empty)
+    next_to_empty = np.bitwise_or.reduce(up | down, axis=0)
+    frontier = _popcount(both & np.concatenate([next_to_empty, next_to_empty]))
+
+    # The pieces of each square: 1 for white, -1 for black
+    pieces = ((white[:, None] & _BITS) != 0).astype(np.float64) \
+        - ((black[:, None] & _BITS) != 0).astype(np.float64)
+
+    scores = MATERIAL_WEIGHT * (white_count - black_count) \
+        + SQUARE_WEIGHT * (pieces @ _SQUARE_SCORE) \
+        + MOBILITY_WEIGHT * (white_moves - black_moves) \
+        + FRONTIER_WEIGHT * (frontier[:n] - frontier[n:])
+
+    finished = (white_moves == 0) & (black_moves == 0)
+    return np.where(finished, np.sign(white_count - black_count) * WIN_SCORE, scores)
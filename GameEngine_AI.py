@@ -11,13 +11,19 @@ Objective: This file contains the AI's players and also it is used to test to ho
 This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
 Player AI and (testing) game engine
 """
+from __future__ import annotations
 
 import random
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
 
-import Visualization    # DO NOT REMOVE THIS LINE
+from Endgame_AI import EndgameSolver
 from GameTree_Game import GameTree
+from Ordering_AI import MoveOrdering
 from Othello_Game import Othello
+from Parallel_AI import generate_moves_parallel
+from Search_AI import Deadline, Searcher
+from Transposition_AI import EXACT, TranspositionTable
 
 
 ####################################################################################
@@ -56,9 +62,28 @@ class Player:
         """
         raise NotImplementedError
 
-    def cpu_make_move(self, game: Othello) -> tuple:
+    def spawn(self) -> Player:
+        """
+        Return a new player with the same settings as this player, but nothing remembered from
+        the games this player played.
+        """
+        return type(self)(self.color, self.normal_depth, self.cutoff, self.cutoff_depth, self.rnd)
+
+    def ponder(self, deadline: Deadline) -> None:
+        """
+        Think about the next move during the opponent's turn, until deadline expires.
+
+        Players which do not keep anything between moves do nothing.
+        """
+        return None
+
+    def cpu_make_move(self, game: Othello, deadline: Optional[Deadline] = None) -> tuple:
         """
         Return a valid move according to the current state of self.game.
+
+        deadline, if given, replaces the time budget of the Player for this move: expiring it
+        (e.g. from the thread of the user interface) makes the Player answer with the best move
+        it has found so far.
         """
         raise NotImplementedError
 
@@ -99,7 +124,7 @@ class RandomPlayer(Player):
         self.gametree = GameTree(game=game)
         self.gametree.generate_moves_quick(self.normal_depth)
 
-    def cpu_make_move(self, game: Othello) -> tuple:
+    def cpu_make_move(self, game: Othello, deadline: Optional[Deadline] = None) -> tuple:
         """
         Return a valid move according to the current state of self.game.
         """
@@ -124,6 +149,23 @@ class SmartPlayerv2(Player):
                 cutoff_depth, which changes the depth of the GameTree
     - rnd: the chance that the player will move randomly
     - gametree: the GameTree of the Player
+    - table: the transposition table shared by all the searches of the Player
+    - ordering: the move ordering of the searches of the Player
+    - time_budget: the number of seconds the Player may think about each move, or None for no
+                limit. With a time budget, the GameTree is extended one level at a time
+                (iterative deepening) up to normal_depth or cutoff_depth, until the time is up.
+    - workers: the number of processes searching the moves of the GameTree's root in parallel
+                (see Parallel_AI); 1 to search in this process only. The parallel search is not
+                used with a time budget, or with a deadline given to cpu_make_move.
+    - endgame_empties: once at most this many squares are empty, the Player finds the best move
+                with its endgame solver instead of the GameTree (0 to never use it)
+    - solver: the endgame solver of the Player
+    - book: an optional OpeningBook (see OpeningBook_AI); the Player plays the moves of the
+                positions in the book without searching
+    - reuse_hits: the number of moves (of both players) for which the GameTree already had a
+                subtree, which became the new GameTree
+    - reuse_misses: the number of moves for which the subtree had been pruned, so a new
+                GameTree was started
     """
     color: int
     normal_depth: int
@@ -131,14 +173,33 @@ class SmartPlayerv2(Player):
     cutoff_depth: int
     rnd: float
     gametree: GameTree
+    table: TranspositionTable
+    ordering: MoveOrdering
+    time_budget: Optional[float]
+    workers: int
+    endgame_empties: int
+    solver: EndgameSolver
+    book: Any
+    reuse_hits: int
+    reuse_misses: int
 
     def __init__(self, color: int, normal_depth: int, cutoff: int,
-                 cutoff_depth: int, rnd: float) -> None:
+                 cutoff_depth: int, rnd: float, time_budget: Optional[float] = None,
+                 workers: int = 1, endgame_empties: int = 0, book: Any = None) -> None:
         self.color = color
         self.normal_depth = normal_depth
         self.cutoff = cutoff
         self.cutoff_depth = cutoff_depth
         self.rnd = rnd
+        self.table = TranspositionTable()
+        self.ordering = MoveOrdering()
+        self.time_budget = time_budget
+        self.workers = workers
+        self.endgame_empties = endgame_empties
+        self.solver = EndgameSolver()
+        self.book = book
+        self.reuse_hits = 0
+        self.reuse_misses = 0
 
     def initialize_gametree(self, game: Othello):
         """
@@ -147,7 +208,24 @@ class SmartPlayerv2(Player):
         self.gametree = GameTree(game)
         self.gametree.generate_moves_quick(self.normal_depth)
 
-    def cpu_make_move(self, game: Othello) -> tuple:
+    def reuse_rate(self) -> float:
+        """
+        Return the fraction of moves for which the GameTree was kept (see reuse_hits).
+        """
+        if self.reuse_hits + self.reuse_misses == 0:
+            return 0.0
+        return self.reuse_hits / (self.reuse_hits + self.reuse_misses)
+
+    def spawn(self) -> SmartPlayerv2:
+        """
+        Return a new player with the same settings as this player, but nothing remembered from
+        the games this player played.
+        """
+        return SmartPlayerv2(self.color, self.normal_depth, self.cutoff, self.cutoff_depth,
+                             self.rnd, self.time_budget, self.workers, self.endgame_empties,
+                             self.book)
+
+    def cpu_make_move(self, game: Othello, deadline: Optional[Deadline] = None) -> tuple:
         """
         Return a valid move according to the current state of self.game.
         """
@@ -162,92 +240,284 @@ class SmartPlayerv2(Player):
         # the subtrees should contain the possible moves of the other player's last turn,
         # but it might NOT contain the previous move since the path may be pruned.
         else:
-            # check if any of the subtrees has the previous move
-            prev_tree = self.gametree.find_subtree_by_move(prev_move)
-
-            # if found, then prev_tree is not None
-            # The subtree will become self.gametree
-            if prev_tree is not None:
-                self.gametree = prev_tree
-
-            # if not found, then create a new tree
-            # game should be the current state of the game
-            else:
-                self.gametree = GameTree(game=game)
-
-        # Step 2: Extend the Gametree
+            self._reroot(game, prev_move, played=True)
+
+        # Step 2: Play the move from the opening book, if the game state is in it
+        if self.book is not None:
+            book_move = self.book.lookup(game)
+            if book_move is not None and random.uniform(0, 1) > self.rnd:
+                self._reroot(game, book_move[0])
+                return book_move[0]
+
+        # Step 3: Solve the endgame exactly, if few enough squares are empty
+        if 64 - sum(game.score()) <= self.endgame_empties and game.get_valid_moves_now() != [] \
+                and random.uniform(0, 1) > self.rnd:
+            move = self.solver.solve(game)[0]
+            self._reroot(game, move)
+            return move
+
+        # Step 4: Extend the Gametree
         # Check if cutoff is reached.
+        self.table.new_search()
+        self.ordering.new_search()
         if sum(game.score()) < self.cutoff:
-            self.gametree.generate_moves_quick(self.normal_depth)
+            depth = self.normal_depth
         else:
-            self.gametree.generate_moves_quick(self.cutoff_depth)
+            depth = self.cutoff_depth
+
+        if deadline is None and self.time_budget is not None:
+            deadline = Deadline(self.time_budget)
+
+        completed_move = None
+        if deadline is not None:
+            completed_move = self._deepen(depth, deadline)
+        elif self.workers > 1:
+            generate_moves_parallel(self.gametree, depth, self.workers, self.table, self.ordering)
+        else:
+            self.gametree.generate_moves_quick(depth, self.table, ordering=self.ordering)
 
         assert self.gametree.get_subtrees() != []
 
-        # Step 3: Choose the best possible moves using self.gametree
-        # If the Player is playing white:
-        if self.color == 1:
-            # If we choose a move from the gametree, choose the best possible move (highest score).
-            if random.uniform(0, 1) > self.rnd:
-                max_score = -100000
-                for subtree in self.gametree.get_subtrees():
-                    if subtree.score > max_score:
-                        max_score = subtree.score
-                        self.gametree = subtree
-
-                assert self.gametree.is_white_move is False
-                return self.gametree.move
-            # If we choose a random move, choose a random move.
+        # Step 5: Choose the best possible moves using self.gametree
+        use_tree = random.uniform(0, 1) > self.rnd
+        # If the last extension of the GameTree was stopped early, its scores are not reliable:
+        # choose the best move of the last complete extension instead.
+        if use_tree and completed_move is not None:
+            self._reroot(game, completed_move)
+            return completed_move
+
+        # If we choose a move from the gametree, choose the best possible move (the highest score
+        # for white, the lowest for black).
+        if use_tree:
+            move = self.gametree.get_best_move()
+        # If we choose a random move, choose a random move.
+        else:
+            valid_moves = self.gametree.game.get_valid_moves_now()
+            if valid_moves != []:
+                move = random.choice(valid_moves)
             else:
-                valid_moves = self.gametree.game.get_valid_moves_now()
-                if valid_moves != []:
-                    move = random.choice(valid_moves)
-                    wanted_tree = self.gametree.find_subtree_by_move(move)
-                    if wanted_tree is not None:
-                        self.gametree = wanted_tree
-                    else:
-                        game_copy = deepcopy(game)
-                        game_copy.make_move(move[0], move[1])
-                        self.gametree = GameTree(game=game_copy)
+                move = ('', '')
+        self._reroot(game, move)
+        return move
+
+    def ponder(self, deadline: Deadline) -> None:
+        """
+        Search the replies of the opponent to the current state of self.gametree (after this
+        player's move) until deadline expires, so that the next cpu_make_move finds the subtree
+        of the reply actually played already searched, and only has to re-root the GameTree.
+
+        The replies are searched one level deeper at a time, up to the depth cpu_make_move will
+        search to, each time starting from the reply the opponent is expected to play (the best
+        one for them according to the GameTree). Each reply is searched as the root of its own
+        tree, so its score is exact. A reply is never searched again less deeply than it already
+        was (e.g. by the last cpu_make_move), except to the final depth.
+        """
+        game = self.gametree.game
+        pieces = sum(game.score()) + 1
+        if game.get_winner() != -100 or 64 - pieces <= self.endgame_empties:
+            return None
+
+        if pieces < self.cutoff:
+            depth = self.normal_depth
+        else:
+            depth = self.cutoff_depth
+
+        self.table.new_search()
+        self.ordering.new_search()
+        # Make sure the GameTree has every reply, including those pruned by the last search,
+        # without searching the ones it already has again. A pass is played as (-1, -1), and
+        # its subtree has the move ('', '').
+        moves = game.get_valid_moves_now()
+        for move in moves or [('', '')]:
+            if self.gametree.find_subtree_by_move(move) is None:
+                if moves == []:
+                    game.make_move(-1, -1)
                 else:
-                    move = ('', '')
-                    game_copy = deepcopy(game)
-                    game_copy.make_move(move[0], move[1])
-                    self.gametree = GameTree(game=game_copy)
-                return move
+                    game.make_move(move[0], move[1])
+                reply = GameTree(game)
+                game.undo_move()
+                reply.calculate_score()
+                self.gametree.add_subtree(reply)
+
+        replies = self.gametree.get_subtrees()
+        for d in range(1, depth + 1):
+            replies.sort(key=lambda reply: reply.score, reverse=self.gametree.is_white_move)
+            for reply in replies:
+                if deadline.expired():
+                    break
+                if (reply.searched_depth > d and d < depth) \
+                        or (reply.searched_depth == d and reply.bound == EXACT):
+                    continue
+                reply.generate_moves_quick(d, self.table, deadline, self.ordering)
+
+        self.gametree.calculate_score()
+        return None
+
+    def _reroot(self, game: Othello, move: tuple, played: bool = False) -> None:
+        """
+        Make the subtree of self.gametree for move the new self.gametree, keeping everything
+        already searched below it, and release the other subtrees.
 
-        # If the Player is playing black:
+        If there is no such subtree (its branch was pruned), only that branch is built: a new
+        GameTree for the game state after move. game is the current game state, before move is
+        played, or after it if played.
+        """
+        wanted_tree = self.gametree.find_subtree_by_move(move)
+        if wanted_tree is not None:
+            self.reuse_hits += 1
+        elif played:
+            self.reuse_misses += 1
+            wanted_tree = GameTree(game=game)
         else:
-            # If we choose a move from the gametree, choose the best possible move (highest score).
-            if random.uniform(0, 1) > self.rnd:
-                min_score = 100000
-                for subtree in self.gametree.get_subtrees():
-                    if subtree.score < min_score:
-                        min_score = subtree.score
-
-                        self.gametree = subtree
-                        assert self.gametree.is_white_move is True
-
-                assert self.gametree.is_white_move is True
-                return self.gametree.move
-            # If we choose a random move, choose a random move.
+            self.reuse_misses += 1
+            game_copy = game.copy()
+            game_copy.make_move(move[0], move[1])
+            wanted_tree = GameTree(game=game_copy)
+
+        self.gametree.release_subtrees()
+        self.gametree = wanted_tree
+
+    def _deepen(self, depth: int, deadline: Deadline) -> Any:
+        """
+        Extend self.gametree to depth 1, 2, ... up to depth, until deadline expires. Each
+        extension searches the best moves of the previous one first (see GameTree.minimaxab).
+
+        A GameTree kept from an earlier search (of the previous turn, or by ponder) which is
+        complete and exact is only extended from the depth after its own, since searching it
+        again less deeply would replace its scores and drop its deeper subtrees.
+
+        Return the best move of the last complete extension if the last extension was stopped
+        early, or None if the GameTree was extended to depth in time. The first extension of a
+        GameTree which was not searched yet is always completed.
+        """
+        start = 1
+        best_move = None
+        searched_depth = self.gametree.searched_depth
+        if 0 < searched_depth <= depth and self.gametree.bound == EXACT \
+                and self.gametree.get_subtrees() != []:
+            start = searched_depth + 1
+            best_move = self.gametree.get_best_move()
+
+        for d in range(start, depth + 1):
+            if d == 1:
+                self.gametree.generate_moves_quick(d, self.table, ordering=self.ordering)
             else:
-                valid_moves = self.gametree.game.get_valid_moves_now()
-                if valid_moves != []:
-                    move = random.choice(valid_moves)
-                    wanted_tree = self.gametree.find_subtree_by_move(move)
-                    if wanted_tree is not None:
-                        self.gametree = wanted_tree
-                    else:
-                        game_copy = deepcopy(game)
-                        game_copy.make_move(move[0], move[1])
-                        self.gametree = GameTree(game=game_copy)
-                else:
-                    move = ('', '')
-                    game_copy = deepcopy(game)
-                    game_copy.make_move(move[0], move[1])
-                    self.gametree = GameTree(game=game_copy)
-                return move
+                self.gametree.generate_moves_quick(d, self.table, deadline, self.ordering)
+                if deadline.expired():
+                    return best_move
+
+            best_move = self.gametree.get_best_move()
+
+        return None
+
+
+class NegamaxPlayer(Player):
+    """
+    A subclass of Player.
+
+    An AI player which searches the current game state with the Searcher (alpha-beta negamax on a
+    single board) instead of building a GameTree. It is much faster than SmartPlayerv2 and can
+    search deeper in the same time; its gametree is never extended.
+
+    Instance attributes:
+    - color: which color this player plays
+    - normal_depth: the depth of the search before the cutoff
+    - cutoff: the number of pieces on the board required to switch from normal_depth to
+                cutoff_depth, which changes the depth of the search
+    - rnd: the chance that the player will move randomly
+    - gametree: the GameTree of the Player (only the current game state)
+    - searcher: the search engine of the Player, with a transposition table and a move ordering
+                shared by all of its searches
+    - time_budget: the number of seconds the Player may think about each move, or None for no
+                limit. With a time budget, the Player searches to depth 1, 2, ... up to
+                normal_depth or cutoff_depth (iterative deepening), until the time is up.
+    - endgame_empties: once at most this many squares are empty, the Player finds the best move
+                with its endgame solver instead of the Searcher (0 to never use it)
+    - solver: the endgame solver of the Player
+    - book: an optional OpeningBook (see OpeningBook_AI); the Player plays the moves of the
+                positions in the book without searching
+    - evaluation: how the Searcher scores positions (see Search_AI.EVALUATIONS). 'features',
+                which also counts mobility, frontier and stable pieces, plays better than the
+                default 'leaf' searched two moves deeper, in less time.
+    """
+    color: int
+    normal_depth: int
+    cutoff: int
+    cutoff_depth: int
+    rnd: float
+    gametree: GameTree
+    searcher: Searcher
+    time_budget: Optional[float]
+    endgame_empties: int
+    solver: EndgameSolver
+    book: Any
+    evaluation: str
+
+    def __init__(self, color: int, normal_depth: int, cutoff: int,
+                 cutoff_depth: int, rnd: float, time_budget: Optional[float] = None,
+                 endgame_empties: int = 0, book: Any = None, evaluation: str = 'leaf') -> None:
+        self.color = color
+        self.normal_depth = normal_depth
+        self.cutoff = cutoff
+        self.cutoff_depth = cutoff_depth
+        self.rnd = rnd
+        self.searcher = Searcher(TranspositionTable(), MoveOrdering(), evaluation)
+        self.time_budget = time_budget
+        self.endgame_empties = endgame_empties
+        self.solver = EndgameSolver()
+        self.book = book
+        self.evaluation = evaluation
+
+    def initialize_gametree(self, game: Othello):
+        """
+        Initialize the GameTree for this player.
+        """
+        self.gametree = GameTree(game)
+
+    def spawn(self) -> NegamaxPlayer:
+        """
+        Return a new player with the same settings as this player, but nothing remembered from
+        the games this player played.
+        """
+        return NegamaxPlayer(self.color, self.normal_depth, self.cutoff, self.cutoff_depth,
+                             self.rnd, self.time_budget, self.endgame_empties, self.book,
+                             self.evaluation)
+
+    def cpu_make_move(self, game: Othello, deadline: Optional[Deadline] = None) -> tuple:
+        """
+        Return a valid move according to the current state of self.game.
+        """
+        valid_moves = game.get_valid_moves_now()
+        if valid_moves == []:
+            move = ('', '')
+        # If we choose a move from the search, choose the best possible move.
+        elif random.uniform(0, 1) > self.rnd:
+            if sum(game.score()) < self.cutoff:
+                depth = self.normal_depth
+            else:
+                depth = self.cutoff_depth
+
+            book_move = self.book.lookup(game) if self.book is not None else None
+            # If the game state is in the opening book, play its move without searching
+            if book_move is not None:
+                move = book_move[0]
+            # If few enough squares are empty, solve the endgame exactly instead
+            elif 64 - sum(game.score()) <= self.endgame_empties:
+                move = self.solver.solve(game)[0]
+            elif deadline is None and self.time_budget is None:
+                move = self.searcher.search(game, depth)[0]
+            else:
+                if deadline is None:
+                    deadline = Deadline(self.time_budget)
+                move = self.searcher.iterative_deepening(game, depth, deadline)[0]
+        # If we choose a random move, choose a random move.
+        else:
+            move = random.choice(valid_moves)
+
+        game_copy = game.copy()
+        game_copy.make_move(move[0], move[1])
+        self.gametree = GameTree(game=game_copy)
+        return move
 
 
 ####################################################################################
@@ -260,20 +530,27 @@ class GameEngine:
     Instance Attributes:
         - white: The White Player
         - black: The Black Player
+        - game_type: the board implementation used for the games, either Othello or
+                     BitboardOthello (faster, for self-play)
     """
     white: Player
     black: Player
+    game_type: type
 
-    def __init__(self, white: Player, black: Player):
+    def __init__(self, white: Player, black: Player, game_type: type = Othello):
         self.white = white
         self.black = black
+        self.game_type = game_type
 
-    def play(self) -> int:
+    def play(self, verbose: bool = True, record: Optional[list] = None) -> int:
         """
-        Play a game of Othello
+        Play a game of Othello, printing the score after every move if verbose
+
+        If record is a list, the Position (see Bitboard_Game) of the game before every move and
+        at the end is appended to it, e.g. to train an evaluation on self-play games.
         """
         # Initialize the game, and the players
-        game = Othello()
+        game = self.game_type()
         self.white.initialize_gametree(game)
         self.black.initialize_gametree(game)
 
@@ -282,8 +559,11 @@ class GameEngine:
 
             # Print the current score, and the difference in pieces
             # (Number of white pieces - Number of black pieces)
-            white, black = game.score()[0], game.score()[1]
-            print(f'{sum(game.score())}: {white}: {black}; Diff: {white - black}')
+            if verbose:
+                white, black = game.score()[0], game.score()[1]
+                print(f'{sum(game.score())}: {white}: {black}; Diff: {white - black}')
+            if record is not None:
+                record.append(game.to_position())
 
             # Make a move
             if not game.is_white_move:
@@ -294,29 +574,78 @@ class GameEngine:
                 result = game.make_move(move[0], move[1])
                 assert result is not False
 
-        white, black = game.score()[0], game.score()[1]
-        print(f'{sum(game.score())}: {white}: {black}; Diff: {white - black}')
+        if record is not None:
+            record.append(game.to_position())
+        if verbose:
+            white, black = game.score()[0], game.score()[1]
+            print(f'{sum(game.score())}: {white}: {black}; Diff: {white - black}')
 
         return game.get_winner()
 
-    def play_many_games(self) -> dict:
+    def play_many_games(self, n_games: int = 100, workers: int = 1, seeds: Optional[list] = None,
+                        verbose: bool = True) -> dict:
         """
-        Play 100 games of Othello between two computer players
+        Play n_games games of Othello between two computer players, with new players (see
+        Player.spawn) for every game, and return the number of games won by each player.
+
+        With more than one worker, the games are split between that many processes, which play
+        quietly. seeds is an optional list with the random seed of each worker, so that the
+        games can be played again.
+
+        Preconditions:
+            - workers >= 1
+            - seeds is None or len(seeds) == workers
         """
+        if seeds is not None and len(seeds) != workers:
+            raise ValueError(f'Expected {workers} seeds, got {len(seeds)}')
+
+        if workers == 1:
+            seed = seeds[0] if seeds is not None else None
+            return _play_games(self.white, self.black, self.game_type, n_games, seed, verbose)
+
         win_count = {'WHITE': 0, 'BLACK': 0, 'DRAW': 0}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            for i in range(0, workers):
+                # Split the games as evenly as possible
+                count = n_games // workers + (1 if i < n_games % workers else 0)
+                seed = seeds[i] if seeds is not None else None
+                futures.append(pool.submit(_play_games, self.white.spawn(), self.black.spawn(),
+                                           self.game_type, count, seed, False))
+
+            for future in futures:
+                for result, count in future.result().items():
+                    win_count[result] += count
+
+        if verbose:
+            print(win_count)
+        return win_count
 
-        for _ in range(0, 100):
-            match = self.play()
-            if match == 1:
-                win_count['WHITE'] += 1
-            elif match == -1:
-                win_count['BLACK'] += 1
-            else:
-                win_count['DRAW'] += 1
 
+def _play_games(white: Player, black: Player, game_type: type, n_games: int, seed: Any,
+                verbose: bool) -> dict:
+    """
+    Play n_games games of Othello between new players with the settings of white and black, and
+    return the number of games won by each player. If seed is not None, the random numbers are
+    seeded with it first.
+    """
+    if seed is not None:
+        random.seed(seed)
+
+    win_count = {'WHITE': 0, 'BLACK': 0, 'DRAW': 0}
+    for _ in range(0, n_games):
+        match = GameEngine(white.spawn(), black.spawn(), game_type).play(verbose)
+        if match == 1:
+            win_count['WHITE'] += 1
+        elif match == -1:
+            win_count['BLACK'] += 1
+        else:
+            win_count['DRAW'] += 1
+
+        if verbose:
             print(win_count)
 
-        return win_count
+    return win_count
 
 
 # Testing
@@ -7,23 +7,12 @@ This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
 from __future__ import annotations
 
 import math
-from copy import deepcopy
 from typing import Any
 
-import Visualization  # DO NOT REMOVE THIS LINE
+from Bitboard_Game import Position
+from Evaluation_AI import leaf_score
 from Othello_Game import Othello
-
-# Score given to the Othello board
-# Higher scores indicate more valuable positions, while negative scores indicate
-# disadvantageous positions
-BOARD_SCORE = [[120, -20, 20, 5, 5, 20, -20, 120],
-               [-20, -40, -5, -5, -5, -5, -40, -20],
-               [20, -5, 15, 3, 3, 15, -5, 20],
-               [5, -5, 3, 3, 3, 3, -5, 5],
-               [5, -5, 3, 3, 3, 3, -5, 5],
-               [20, -5, 15, 3, 3, 15, -5, 20],
-               [-20, -40, -5, -5, -5, -5, -40, -20],
-               [120, -20, 20, 5, 5, 20, -20, 120]]
+from Transposition_AI import EXACT, LOWER, UPPER
 
 
 class GameTree:
@@ -32,8 +21,11 @@ class GameTree:
 
 
     Instance Attributes:
-        - game: the current game state. Note that this game state is after self.move is applied and
-                before any move from the subtrees is applied
+        - position: the current game state, stored as a compact Position. Note that this game
+                    state is after self.move is applied and before any move from the subtrees is
+                    applied
+        - game: a new game (of the same type as the game the tree was created with) in the state
+                given by position
         - move: the previous move of the game. Default value is ('START', 'START')
                 The moves of the subtrees are the moves that are available
         - is_white_move: whether it is white's turn to move (i.e. to choose a move from the
@@ -41,13 +33,26 @@ class GameTree:
         - score: score is determined by all the scores of the subtrees. A more positive score
                  indicates a more advantageous move for white; a more negative score indicates a
                  more advantageous move for black
+        - searched_depth: the depth of the last completed search of this tree (by minimax or
+                 minimaxab), or -1 if it was never searched or its last search was stopped early.
+                 A tree kept between searches is not searched again if it was already searched
+                 to the same depth (see bound): a deeper search would give it a different score.
+        - bound: whether score is the exact result of that search (EXACT), or only a lower
+                 (LOWER) or upper (UPPER) bound of it because of alpha-beta pruning, like in a
+                 TranspositionTable
     """
-    # _subtrees: the list of subtrees of the root of the GameTree
-    game: Othello
+    # _subtrees: the subtrees of the root of the GameTree, by move, in the order they were added
+    # _game_type: the type of the game the tree was created with (Othello or BitboardOthello)
+    __slots__ = ('position', 'move', 'is_white_move', 'score', 'searched_depth', 'bound',
+                 '_subtrees', '_game_type')
+    position: Position
     move: tuple
     is_white_move: bool
     score: float
-    _subtrees: list[GameTree]
+    searched_depth: int
+    bound: int
+    _subtrees: dict[tuple, GameTree]
+    _game_type: type
 
     def __init__(self, game: Othello = Othello(), score: float = 0.0) -> None:
         """
@@ -58,32 +63,65 @@ class GameTree:
         The score of this (previous) move.
 
         Note that self.move == game.previous_move. The default value is ('START', 'START').
+        Only a Position of game is kept, so game can be changed afterwards.
         """
-        self.game = game
+        self.position = game.to_position()
+        self._game_type = type(game)
         self.move = game.previous_move
         self.is_white_move = game.is_white_move
         self.score = score
-        self._subtrees = []
+        self.searched_depth = -1
+        self.bound = EXACT
+        self._subtrees = {}
+
+    @property
+    def game(self) -> Any:
+        """Return a new game in the state of this node."""
+        return self._game_type.from_position(self.position)
 
     def get_subtrees(self) -> list[GameTree]:
         """Return the subtrees of game tree."""
-        return self._subtrees
+        return list(self._subtrees.values())
 
     def find_subtree_by_move(self, move: tuple) -> Any:
         """Return the subtree corresponding to the given move.
 
         Return None if no subtree corresponds to that move.
         """
-        for subtree in self._subtrees:
-            if subtree.move == move:
-                return subtree
+        return self._subtrees.get(move)
 
-        return None
+    def release_subtrees(self) -> None:
+        """Remove all the subtrees of this game tree, so that the memory of the ones which are not
+        used anywhere else is freed now. This tree is then a leaf which was never searched.
+        """
+        self._subtrees = {}
+        self.searched_depth = -1
 
     def add_subtree(self, subtree: GameTree) -> None:
-        """Add a subtree to this game tree, and recalculate the score of the root of the tree."""
-        self._subtrees.append(subtree)
-        self.calculate_score()
+        """Add a subtree to this game tree, and update the score of the root of the tree.
+
+        The score is updated from the score of the new subtree only (it is the running maximum or
+        minimum of the scores of the subtrees), so adding k subtrees takes O(k) time. If a subtree
+        with the same move is replaced, the score is recalculated from all the subtrees instead.
+
+        Preconditions:
+            - the scores of the other subtrees have not changed since the score of this tree was
+              last calculated
+        """
+        replaced = subtree.move in self._subtrees
+        first = not self._subtrees
+        self._subtrees[subtree.move] = subtree
+        if replaced:
+            self.calculate_score()
+            return None
+
+        # The same result as calculate_score, which starts from -100000 or 100000
+        if self.is_white_move:
+            if first or subtree.score > self.score:
+                self.score = max(subtree.score, -100000)
+        else:
+            if first or subtree.score < self.score:
+                self.score = min(subtree.score, 100000)
 
     def calculate_score(self) -> None:
         """
@@ -92,41 +130,10 @@ class GameTree:
         Preconditions:
             - each subtree has its own score calculated already.
         """
-        special_moves = [('GG', 'GG'), ('START', 'START'), ('', '')]
-
         # Case 1: calculate the score of a leaf
-        if self._subtrees == []:
-
-            w, b = self.game.score()
-
-            # Case 1a: the leaf is the end of the game
-            if self.move == ('GG', 'GG'):
-                w, b = self.game.score()
-                if w > b:
-                    self.score = 10000
-                elif w < b:
-                    self.score = -10000
-                else:
-                    self.score = 0
-
-            # Case 1b: the leaf is the beginning of the game
-            elif self.move == ('START', 'START'):
-                self.score = 0
-
-            # Case 1c: the leaf is a pass-your-turn move
-            elif self.move == ('', ''):
-                if self.is_white_move:
-                    self.score = 100
-                else:
-                    self.score = -100
-
-            # Case 1d: the leaf is a normal move
-            if self.move not in special_moves:
-                if self.is_white_move:
-                    self.score = (w - b) * 0.75 + BOARD_SCORE[self.move[0]][self.move[1]] * -0.25
-                else:
-                    self.score = (w - b) * 0.75 + BOARD_SCORE[self.move[0]][
-                        self.move[1]] * 0.25
+        if not self._subtrees:
+            w, b = self.position.score()
+            self.score = leaf_score(self.move, self.is_white_move, w, b)
 
         # Case 2: calculate a 'node' in the middle of a tree
         else:
@@ -135,7 +142,7 @@ class GameTree:
             # the score is the maximum of the scores of all subtrees
             if self.is_white_move:
                 self.score = -100000
-                for subtree in self._subtrees:
+                for subtree in self._subtrees.values():
                     if subtree.score > self.score:
                         self.score = subtree.score
 
@@ -144,7 +151,7 @@ class GameTree:
             # the score is the minimum of the scores of all subtrees
             else:
                 self.score = 100000
-                for subtree in self._subtrees:
+                for subtree in self._subtrees.values():
                     if subtree.score < self.score:
                         self.score = subtree.score
 
@@ -156,7 +163,8 @@ class GameTree:
         """
         self.minimax(d)
 
-    def generate_moves_quick(self, d: int) -> None:
+    def generate_moves_quick(self, d: int, table: Any = None, deadline: Any = None,
+                             ordering: Any = None) -> None:
         """
         Generate the tree using minimax and alpha-beta pruning, all strategically-viable paths
         up to depth d.
@@ -165,8 +173,13 @@ class GameTree:
         minimax and alpha-beta pruning, the maximizer is White Player and minimizer is Black Player;
         alpha-beta pruning is used to calculate whether the possible path calculated for the
         maximizer/minimizer is strategically-viable. "Bad" paths are omitted in this tree.
+
+        table is an optional TranspositionTable, which can be shared by many searches. deadline is
+        an optional Deadline (see Search_AI): once it expires, the positions which are not searched
+        yet become leaves, so the tree is not as deep as d. ordering is an optional MoveOrdering
+        (see Ordering_AI), which decides the order in which the moves are searched.
         """
-        self.minimaxab(d)
+        self.minimaxab(d, table=table, deadline=deadline, ordering=ordering)
 
     def minimax(self, depth: int) -> None:
         """
@@ -175,47 +188,53 @@ class GameTree:
         Note: this function is not inefficient and should not be called with large values of d.
         """
         # if depth is 0, no subtrees should be generated. Calculate the score of this leaf.
+        # The subtrees kept from a deeper search are dropped, or they would give it their score.
+        self.searched_depth, self.bound = depth, EXACT
         if depth == 0:
+            self._subtrees = {}
             self.calculate_score()
             return None
 
         # if depth > 0:
+        # The children are created by making and undoing each move on one copy of the game state
+        game = self.game
+
+        # Each search leaves the score of its tree up to date, so the score of a new subtree is
+        # added to the running score of this tree; if the score of an existing subtree changes,
+        # the score of this tree is recalculated once at the end
+        changed = False
+
         # There are valid moves
-        if self.game.get_valid_moves_now() != []:
-            for move in self.game.get_valid_moves_now():
+        if game.get_valid_moves_now() != []:
+            for move in game.get_valid_moves_now():
                 # First, check if there is existing subtree
                 subtree = self.find_subtree_by_move(move)
 
                 # if subtree does not exist
                 if subtree is None:
-                    # copy the current game state and make the move
-                    game_copy = deepcopy(self.game)
-                    game_copy.make_move(move[0], move[1])
                     # make a new subtree
-                    subtree = GameTree(game_copy)
+                    subtree = _make_subtree(game, move)
                     # Recurse into the paths
                     subtree.minimax(depth - 1)
-                    subtree.calculate_score()
                     # Add the newly-created subtree to the root
                     self.add_subtree(subtree)
                 # If the subtree exists, just recurse into it
                 else:
                     # Recurse into the paths
                     subtree.minimax(depth - 1)
-                    subtree.calculate_score()
+                    changed = True
 
         # There is no valid moves in this turn
         else:
             # Game might have ended
-            if self.game.get_valid_moves_white() == set() == self.game.get_valid_moves_black():
-                # First, check if there is existing subtree
-                move = ('GG', 'GG')
+            if game.get_valid_moves_white() == set() == game.get_valid_moves_black():
+                # First, check if there is existing subtree. The subtree is made by passing, so its
+                # move is ('', '')
+                move = ('', '')
                 subtree = self.find_subtree_by_move(move)
                 # If subtree does not exist, create a new subtree
                 if subtree is None:
-                    game_copy = deepcopy(self.game)
-                    game_copy.make_move(-1, -1)
-                    subtree = GameTree(game_copy)
+                    subtree = _make_subtree(game, (-1, -1))
                     subtree.calculate_score()
                     # Add the newly-created subtree to the root
                     self.add_subtree(subtree)
@@ -228,21 +247,22 @@ class GameTree:
                 subtree = self.find_subtree_by_move(move)
                 # If subtree does not exist, create a new subtree
                 if subtree is None:
-                    game_copy = deepcopy(self.game)
-                    game_copy.make_move(-1, -1)
-                    subtree = GameTree(game_copy)
+                    subtree = _make_subtree(game, (-1, -1))
                     # Recurse into the paths
                     subtree.minimax(depth - 1)
-                    subtree.calculate_score()
                     # Add the newly-created subtree to the root
                     self.add_subtree(subtree)
                 # If the subtree exists, just recurse into it
                 else:
                     # Recurse into the paths
                     subtree.minimax(depth - 1)
-                    subtree.calculate_score()
+                    changed = True
+
+        if changed:
+            self.calculate_score()
 
-    def minimaxab(self, depth: int, a: float = -math.inf, b: float = math.inf) -> None:
+    def minimaxab(self, depth: int, a: float = -math.inf, b: float = math.inf,
+                  table: Any = None, deadline: Any = None, ordering: Any = None) -> None:
         """
         Generate the tree using minimax and alpha-beta pruning, all strategically-viable paths
         up to depth d.
@@ -251,64 +271,100 @@ class GameTree:
         minimax and alpha-beta pruning, the maximizer is White Player and minimizer is Black Player;
         alpha-beta pruning is used to calculate whether the possible path calculated for the
         maximizer/minimizer is strategically-viable. "Bad" paths are omitted in this tree.
+
+        If a TranspositionTable is given, the subtrees of positions which were already searched
+        deeply enough are not searched again: their score is taken from the table. The best move
+        stored for this position is searched first, and the result of this search is stored.
+
+        If a MoveOrdering is given, the moves are searched in its order (which puts the best move
+        from the table first only if its 'table' heuristic is used), and the moves causing cutoffs
+        are recorded in it.
+
+        If a Deadline is given and it expires, the search stops early: the tree is scored as far
+        as it was built, and no more results are stored in the table.
         """
         # Case 1:
-        # if depth is 0, no subtrees should be generated. Calculate the score of this leaf.
+        # if depth is 0 or there is no time left, no subtrees should be generated.
+        # Calculate the score of this leaf. At depth 0, the subtrees kept from a deeper search are
+        # dropped, or they would give it their score.
 
-        if depth == 0:
+        if depth == 0 or (deadline is not None and deadline.expired()):
+            if depth == 0:
+                self._subtrees = {}
             self.calculate_score()
+            self.searched_depth = -1 if depth > 0 else 0
+            self.bound = EXACT
             return None
 
         # if depth > 0.
+        # The children are created by making and undoing each move on one copy of the game state
+        game = self.game
+        a_start, b_start = a, b
+
         # Case 2: there are valid moves
-        if self.game.get_valid_moves_now() != []:
-            for move in self.game.get_valid_moves_now():
+        if game.get_valid_moves_now() != []:
+            moves = game.get_valid_moves_now()
+
+            # Search the best move found by a previous search first
+            table_move = None
+            if table is not None:
+                entry = table.lookup(self.position.zobrist)
+                if entry is not None and entry.best_move in moves:
+                    table_move = entry.best_move
+
+            if ordering is not None:
+                moves = ordering.order(game, moves, depth, table_move)
+            elif table_move is not None:
+                moves.remove(table_move)
+                moves.insert(0, table_move)
+
+            # The subtrees of an earlier search are only kept if this search reaches them again:
+            # the scores of the others are out of date, so they are released. Every subtree is
+            # added after it is searched, so the score of this tree is kept up to date by
+            # add_subtree.
+            earlier = self._subtrees
+            self._subtrees = {}
+
+            for move in moves:
 
                 # First, check if there is existing subtree
-                subtree = self.find_subtree_by_move(move)
+                subtree = earlier.get(move)
 
                 # If subtree does not exist, create a new subtree
                 if subtree is None:
-                    game_copy = deepcopy(self.game)
-                    game_copy.make_move(move[0], move[1])
-                    subtree = GameTree(game_copy)
-                    # Recurse into the paths
-                    subtree.minimaxab(depth - 1, a, b)
-                    subtree.calculate_score()
-                    # Add the newly-created subtree to the root
-                    self.add_subtree(subtree)
-                # If the subtree exists, just recurse into it
-                else:
-                    # Recurse into the paths
-                    subtree.minimaxab(depth - 1, a, b)
-                    subtree.calculate_score()
+                    subtree = _make_subtree(game, move)
+
+                # Recurse into the paths
+                subtree._search(depth - 1, a, b, table, deadline, ordering)
+                # Add the subtree to the root
+                self.add_subtree(subtree)
 
                 # Alpha-beta pruning: determine if we still need to create more subtrees
                 # Maximizer: want max score
                 if self.is_white_move:
                     a = max(a, self.score)
-                    if b <= a:
-                        break
                 # Minimizer: want min score
                 else:
                     b = min(b, self.score)
-                    if b <= a:
-                        break
+
+                if b <= a:
+                    if ordering is not None:
+                        ordering.record_cutoff(self.is_white_move, move, depth)
+                    break
 
         # Case 3: No valid moves
         else:
             # Case 3a: game over (both sides have no valid moves)
-            if self.game.get_valid_moves_white() == set() == self.game.get_valid_moves_black():
+            if game.get_valid_moves_white() == set() == game.get_valid_moves_black():
 
-                # First, check if there is existing subtree
-                move = ('GG', 'GG')
+                # First, check if there is existing subtree. The subtree is made by passing, so its
+                # move is ('', '')
+                move = ('', '')
                 subtree = self.find_subtree_by_move(move)
 
                 # If subtree does not exist, create a new subtree
                 if subtree is None:
-                    game_copy = deepcopy(self.game)
-                    game_copy.make_move(-1, -1)
-                    subtree = GameTree(game_copy)
+                    subtree = _make_subtree(game, (-1, -1))
                     subtree.calculate_score()
                     # Add the newly-created subtree to the root
                     self.add_subtree(subtree)
@@ -321,32 +377,69 @@ class GameTree:
                 subtree = self.find_subtree_by_move(move)
                 # If subtree does not exist, create a new subtree
                 if subtree is None:
-                    game_copy = deepcopy(self.game)
-                    game_copy.make_move(-1, -1)
-                    subtree = GameTree(game_copy)
+                    subtree = _make_subtree(game, (-1, -1))
                     # Recurse into the paths
-                    subtree.minimaxab(depth - 1, a, b)
-                    subtree.calculate_score()
+                    subtree._search(depth - 1, a, b, table, deadline, ordering)
                     # Add the newly-created subtree to the root
                     self.add_subtree(subtree)
 
                 # If the subtree exists, just recurse into it
                 else:
                     # Recurse into the paths
-                    subtree.minimaxab(depth - 1, a, b)
-                    subtree.calculate_score()
+                    subtree._search(depth - 1, a, b, table, deadline, ordering)
 
-                # Alpha-beta pruning: determine if we still need to create more subtrees
-                # Maximizer: want max score
-                if self.is_white_move:
-                    a = max(a, self.score)
-                    if b <= a:
-                        return
-                # Minimizer: want min score
-                else:
-                    b = min(b, self.score)
-                    if b <= a:
-                        return
+            # The score of the only subtree may have changed if it already existed
+            self.calculate_score()
+
+        # Remember the result of this search, unless it was stopped early
+        if deadline is not None and deadline.expired():
+            self.searched_depth = -1
+            return None
+
+        if self.score <= a_start:
+            self.bound = UPPER
+        elif self.score >= b_start:
+            self.bound = LOWER
+        else:
+            self.bound = EXACT
+        self.searched_depth = depth
+        if table is not None:
+            table.store(self.position.zobrist, depth, self.score, self.bound, self.get_best_move())
+
+    def _search(self, depth: int, a: float, b: float, table: Any, deadline: Any,
+                ordering: Any) -> None:
+        """Search this tree with minimaxab, unless this tree was already searched to the same
+        depth by an earlier search (so it keeps its subtrees and score), or table already has a
+        good enough result for this position, in which case only the score of this tree is set
+        (and its subtrees no longer match it, so it counts as not searched).
+        """
+        if depth > 0 and self.searched_depth == depth and (
+                self.bound == EXACT or (self.bound == LOWER and self.score >= b)
+                or (self.bound == UPPER and self.score <= a)):
+            return
+
+        if table is not None and depth > 0:
+            entry = table.lookup(self.position.zobrist)
+            if entry is not None and entry.cutoff(depth, a, b):
+                self.score = entry.score
+                self.searched_depth = -1
+                return
+
+        self.minimaxab(depth, a, b, table, deadline, ordering)
+
+    def get_best_move(self) -> Any:
+        """Return the move of the subtree with the best score for the player to move, or None if
+        this tree has no subtrees.
+        """
+        best = None
+        for subtree in self._subtrees.values():
+            if best is None or (self.is_white_move and subtree.score > best.score) or \
+                    (not self.is_white_move and subtree.score < best.score):
+                best = subtree
+
+        if best is None:
+            return None
+        return best.move
 
     def __str__(self) -> str:
         """Return a string representation of this tree.
@@ -364,10 +457,10 @@ class GameTree:
             turn_desc = "Black's move"
         move_desc = f'{self.move}: {self.score} -> {turn_desc}\n'
         s = '   ' * depth + move_desc
-        if self._subtrees == []:
+        if not self._subtrees:
             return s
         else:
-            for subtree in self._subtrees:
+            for subtree in self._subtrees.values():
                 s += subtree._str_indented(depth + 1)
             return s
 
@@ -388,3 +481,14 @@ class GameTree:
         with open('prunedtree_depth_5.txt', 'w') as file:
             # writer = txt.writer(file)
             file.writelines(self.__str__())
+
+
+def _make_subtree(game: Any, move: tuple) -> GameTree:
+    """Return a new GameTree for the game state after move is made on game.
+
+    game is left unchanged: the move is made and then undone.
+    """
+    game.make_move(move[0], move[1])
+    subtree = GameTree(game)
+    game.undo_move()
+    return subtree
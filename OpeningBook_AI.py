@@ -0,0 +1,203 @@
+"""
+Objective: This file contains the opening book of the computer players: the best moves of the
+           positions of the first few moves of a game, found once (offline) by deep searches, so
+           that the players do not need to search them again in every game.
+
+           Positions which are the same up to a rotation or a reflection of the board have the
+           same best move (rotated or reflected), so only one of the 8 symmetric positions is
+           stored: the one with the smallest Zobrist hash.
+
+           The book is stored in a compact binary file: a header, then one fixed-size record per
+           position, sorted by hash. The file is memory-mapped and searched with binary search,
+           so looking up a move takes microseconds and the book is never read into memory.
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from typing import Any, Optional
+
+from Bitboard_Game import PERMUTATIONS, BitboardOthello, squares, zobrist_hash
+from Ordering_AI import MoveOrdering
+from Search_AI import Searcher
+from Transposition_AI import TranspositionTable
+
+# The file format: the header is (magic, version, number of records), and each record is
+# (Zobrist hash, square of the best move, score of the best move from white's point of view)
+MAGIC = b'OTHB'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+RECORD = struct.Struct('<QBf')
+
+# The book shipped with the game
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+# For each symmetry (see Bitboard_Game.SYMMETRIES), the square each square comes from
+INVERSES = [[permutation.index(s) for s in range(0, 64)] for permutation in PERMUTATIONS]
+
+# The default book, loaded by default_book
+_default_book: Any = None
+
+
+def _transform(bitboard: int, permutation: list) -> int:
+    """
+    Return the bitboard with every square moved according to permutation.
+    """
+    result = 0
+    for square in squares(bitboard):
+        result |= 1 << permutation[square]
+    return result
+
+
+def canonical(white: int, black: int, is_white_move: bool) -> tuple:
+    """
+    Return the Zobrist hash of the symmetric position with the smallest hash, and the index of
+    the symmetry (in Bitboard_Game.SYMMETRIES) which turns the position into that one.
+    """
+    best_key, best_symmetry = None, 0
+    for i, permutation in enumerate(PERMUTATIONS):
+        key = zobrist_hash(_transform(white, permutation), _transform(black, permutation),
+                           is_white_move)
+        if best_key is None or key < best_key:
+            best_key, best_symmetry = key, i
+    return (best_key, best_symmetry)
+
+
+class OpeningBook:
+    """
+    An opening book read from a file made by write_book.
+
+    Instance Attributes:
+        - path: the path of the file
+        - size: the number of positions in the book
+    """
+    # Private Instance Attributes:
+    #   - _file: the open file
+    #   - _map: the memory map of the file
+    path: str
+    size: int
+    _file: Any
+    _map: Any
+
+    def __init__(self, path: str = DEFAULT_BOOK_PATH) -> None:
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'{path} is not an opening book of version {VERSION}')
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __reduce__(self) -> tuple:
+        """
+        Books are pickled by path (e.g. to send a Player to another process), since memory maps
+        cannot be pickled.
+        """
+        return (OpeningBook, (self.path,))
+
+    def close(self) -> None:
+        """
+        Close the file of this book.
+        """
+        self._map.close()
+        self._file.close()
+
+    def lookup(self, game: Any) -> Optional[tuple]:
+        """
+        Return the best move and its score (from white's point of view) for the current state of
+        game, or None if it is not in the book.
+        """
+        position = game.to_position()
+        key, symmetry = canonical(position.white, position.black, position.is_white_move)
+
+        # Binary search for the first record with a hash >= key
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if RECORD.unpack_from(self._map, HEADER.size + middle * RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == self.size:
+            return None
+        record_key, square, score = RECORD.unpack_from(self._map, HEADER.size + low * RECORD.size)
+        if record_key != key:
+            return None
+
+        # The move is stored for the symmetric position: turn it back
+        square = INVERSES[symmetry][square]
+        return ((square >> 3, square & 7), score)
+
+
+def default_book() -> Optional[OpeningBook]:
+    """
+    Return the book shipped with the game (loaded once), or None if there is no book file.
+    """
+    global _default_book
+
+    if _default_book is None and os.path.exists(DEFAULT_BOOK_PATH):
+        _default_book = OpeningBook(DEFAULT_BOOK_PATH)
+    return _default_book
+
+
+def write_book(path: str, records: dict) -> None:
+    """
+    Write a book file with the given records, a mapping from the canonical hash (see canonical)
+    of each position to (square of the best move in the canonical position, score).
+    """
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        for key in sorted(records):
+            square, score = records[key]
+            file.write(RECORD.pack(key, square, score))
+
+
+def build_book(path: str = DEFAULT_BOOK_PATH, plies: int = 6, depth: int = 6) -> int:
+    """
+    Search every position reachable in fewer than plies moves from the start of the game to
+    depth, write their best moves to a book file at path, and return the number of positions.
+
+    Symmetric positions are only searched once.
+    """
+    searcher = Searcher(TranspositionTable(1 << 18), MoveOrdering())
+    records = {}
+    frontier = [BitboardOthello()]
+    for _ in range(0, plies):
+        next_frontier = []
+        for game in frontier:
+            key, symmetry = canonical(game.white, game.black, game.is_white_move)
+            if key in records:
+                continue
+
+            move, score = searcher.search(game, depth)
+            if move == ('', ''):
+                continue
+            records[key] = (PERMUTATIONS[symmetry][move[0] * 8 + move[1]], score)
+
+            for next_move in game.get_valid_moves_now():
+                next_game = game.copy()
+                next_game.make_move(next_move[0], next_move[1])
+                next_frontier.append(next_game)
+        frontier = next_frontier
+
+    write_book(path, records)
+    return len(records)
+
+
+# Testing
+if __name__ == '__main__':
+    import sys
+    import time
+
+    start = time.time()
+    count = build_book(plies=int(sys.argv[1]) if len(sys.argv) > 1 else 6,
+                       depth=int(sys.argv[2]) if len(sys.argv) > 2 else 6)
+    print(f'{count} positions in {time.time() - start:.1f}s')
@@ -0,0 +1,120 @@
+"""
+Objective: This file contains the move ordering used by the alpha-beta searches of the computer
+           players (GameTree.minimaxab and Searcher.negamax). Alpha-beta pruning cuts the most
+           branches when the best move is searched first, so the moves of each position are
+           sorted by a few cheap guesses of how good they are.
+
+           The following heuristics can be switched on or off, to compare their effect:
+           - 'table': the best move stored in the transposition table by a previous search
+           - 'killer': moves which caused a cutoff in another position at the same depth
+           - 'history': moves which caused many cutoffs anywhere in the search
+           - 'square': the value of the square of the move, according to BOARD_SCORE
+           - 'fastest': moves which leave the opponent the fewest valid moves
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+from typing import Any
+
+from Evaluation_AI import BOARD_SCORE
+
+# All heuristics, in the order in which they are applied
+HEURISTICS = ('table', 'killer', 'history', 'square', 'fastest')
+
+# The heuristics used when none are given
+DEFAULT_HEURISTICS = ('table', 'killer', 'history', 'square')
+
+# The number of killer moves remembered for each depth
+KILLERS_PER_DEPTH = 2
+
+# Counting the replies of every move is slow, so the 'fastest' heuristic is only used for
+# positions searched at least this deep
+FASTEST_MIN_DEPTH = 3
+
+
+class MoveOrdering:
+    """
+    A move ordering for alpha-beta searches. The same MoveOrdering can be used for many searches;
+    call new_search before each one.
+
+    Moves are sorted by the first heuristic, then ties are broken by the next one, and so on. Moves
+    which all heuristics consider equal keep their original order.
+
+    Instance Attributes:
+        - heuristics: the names of the heuristics used, a subset of HEURISTICS
+    """
+    # Private Instance Attributes:
+    #   - _killers: the killer moves of each depth, the most recent first
+    #   - _history: the history score of each (is_white_move, move)
+    heuristics: tuple
+    _killers: dict[int, list]
+    _history: dict[tuple, int]
+
+    def __init__(self, heuristics: tuple = DEFAULT_HEURISTICS) -> None:
+        for heuristic in heuristics:
+            if heuristic not in HEURISTICS:
+                raise ValueError(f'Unknown move ordering heuristic: {heuristic}')
+
+        self.heuristics = tuple(h for h in HEURISTICS if h in heuristics)
+        self._killers = {}
+        self._history = {}
+
+    def new_search(self) -> None:
+        """
+        Mark the start of a new search. The killer moves are forgotten, since the depths of the
+        new search do not match the old ones, and the history scores are halved, so that the
+        moves of the new search soon count more than the old ones.
+        """
+        self._killers = {}
+        self._history = {key: value // 2 for key, value in self._history.items() if value > 1}
+
+    def order(self, game: Any, moves: list, depth: int, table_move: Any = None) -> list:
+        """
+        Return moves, the valid moves of game to be searched to depth, sorted from the most to
+        the least promising. table_move is the best move stored in the transposition table for
+        game, or None.
+
+        game is not changed (it may be changed and restored for the 'fastest' heuristic).
+        """
+        if self.heuristics == () or len(moves) < 2:
+            return moves
+
+        heuristics = self.heuristics
+        if depth < FASTEST_MIN_DEPTH and 'fastest' in heuristics:
+            heuristics = heuristics[:-1]
+
+        killers = self._killers.get(depth, [])
+        is_white_move = game.is_white_move
+        keys = {}
+        for move in moves:
+            key = []
+            for heuristic in heuristics:
+                if heuristic == 'table':
+                    key.append(move == table_move)
+                elif heuristic == 'killer':
+                    key.append(move in killers)
+                elif heuristic == 'history':
+                    key.append(self._history.get((is_white_move, move), 0))
+                elif heuristic == 'square':
+                    key.append(BOARD_SCORE[move[0]][move[1]])
+                else:
+                    game.make_move(move[0], move[1])
+                    key.append(-len(game.get_valid_moves_now()))
+                    game.undo_move()
+            keys[move] = tuple(key)
+
+        return sorted(moves, key=keys.__getitem__, reverse=True)
+
+    def record_cutoff(self, is_white_move: bool, move: tuple, depth: int) -> None:
+        """
+        Record that move, played by white if is_white_move, caused a cutoff in a search to depth.
+        """
+        if move == ('', ''):
+            return None
+
+        killers = self._killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLERS_PER_DEPTH:]
+
+        key = (is_white_move, move)
+        self._history[key] = self._history.get(key, 0) + depth * depth
@@ -6,10 +6,15 @@ Objective: This file is used to initialize the gaming board for Othello, and upd
 
 This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
 """
-import pygame
+from __future__ import annotations
+
 from typing import Any
 
-import Visualization
+from Bitboard_Game import Position, ZOBRIST_WHITE_MOVE, from_gameboard, popcount, \
+    to_gameboard, zobrist_hash, zobrist_update
+
+# The 8 directions on the gameboard as (row step, column step)
+DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)]
 
 
 class Othello:
@@ -23,11 +28,32 @@ class Othello:
         - gameboard: the current state of the gameboard
         - is_white_move: whether it is white's turn to move
         - previous_move: the previous move of the game. Default value is ('START', 'START').
+        - white_count: the number of white pieces on the gameboard
+        - black_count: the number of black pieces on the gameboard
+        - empty_count: the number of empty squares on the gameboard
+        - zobrist: the Zobrist hash of the current position
+
+    Note that the counts and the hash are kept up to date by make_move and undo_move, so the
+    gameboard should not be modified directly.
 
+    Every move played with make_move can be taken back with undo_move, so a search can walk a
+    single board instead of copying it for every position.
     """
+    # Private Instance Attributes:
+    #   - _valid_moves: the cached result of get_valid_moves_and_flips for each color on the
+    #                   current gameboard. It is cleared whenever the gameboard changes.
+    #   - _history: the undo records of the moves played with make_move, the last move at the end.
+    #               A record is (previous_move, is_white_move, move, captured, valid_moves,
+    #               zobrist), the state before the move; move is None for a pass.
     gameboard: list
     is_white_move: bool
     previous_move: tuple
+    white_count: int
+    black_count: int
+    empty_count: int
+    zobrist: int
+    _valid_moves: dict
+    _history: list
 
     def __init__(self) -> None:
         self.gameboard = [[0, 0, 0, 0, 0, 0, 0, 0],
@@ -42,10 +68,63 @@ class Othello:
         self.is_white_move = False
         self.previous_move = ('START', 'START')
 
-    def draw_game_state(self, screen: pygame.Surface, pos_size: tuple) -> None:
+        self.white_count = 2
+        self.black_count = 2
+        self.empty_count = 60
+        self.zobrist = zobrist_hash(*from_gameboard(self.gameboard), self.is_white_move)
+
+        self._valid_moves = {}
+        self._history = []
+
+    def copy(self) -> Othello:
+        """
+        Return a copy of the current game state, without the history of moves to undo.
+
+        This is much cheaper than copy.deepcopy.
+        """
+        game = Othello.__new__(Othello)
+        game.gameboard = [row[:] for row in self.gameboard]
+        game.is_white_move = self.is_white_move
+        game.previous_move = self.previous_move
+        game.white_count = self.white_count
+        game.black_count = self.black_count
+        game.empty_count = self.empty_count
+        game.zobrist = self.zobrist
+        game._valid_moves = dict(self._valid_moves)
+        game._history = []
+        return game
+
+    def to_position(self) -> Position:
+        """
+        Return the current game state as a Position.
+        """
+        white, black = from_gameboard(self.gameboard)
+        return Position(white, black, self.is_white_move, self.previous_move, self.zobrist)
+
+    @classmethod
+    def from_position(cls, position: Position) -> Othello:
+        """
+        Return a new game in the state given by position.
         """
-        Draw the current state of the game board.
+        game = cls()
+        game.gameboard = to_gameboard(position.white, position.black)
+        game.is_white_move = position.is_white_move
+        game.previous_move = position.previous_move
+        game.white_count = popcount(position.white)
+        game.black_count = popcount(position.black)
+        game.empty_count = 64 - game.white_count - game.black_count
+        game.zobrist = position.zobrist
+        return game
+
+    def draw_game_state(self, screen: Any, pos_size: tuple) -> None:
         """
+        Draw the current state of the game board on screen, a pygame Surface.
+
+        The user interface (and pygame) is only imported here, so that the game can be played
+        without it (e.g. by the computer players in worker processes).
+        """
+        import Visualization
+
         # Get all valid moves
         valid_moves = self.get_valid_moves_now()
 
@@ -85,53 +164,71 @@ class Othello:
 
     def make_move(self, y: Any, x: Any) -> Any:
         """
-        Make move for the current color, and return the position of pieces captured
+        Make move for the current color, and return the number of pieces captured
         """
-        # If the current player has no valid moves AND no one is a winner,
-        # pass the turn.
-        if self.get_valid_moves_now() == [] or self.get_winner() != -100:
+        color = 1 if self.is_white_move else -1
+        moves = self.get_valid_moves_and_flips(color)
+
+        # If the current player has no valid moves (this is also the case when there is a
+        # winner), pass the turn.
+        if moves == {}:
+            self._history.append((self.previous_move, self.is_white_move, None, [], None,
+                                  self.zobrist))
             self.is_white_move = not self.is_white_move
+            self.zobrist ^= ZOBRIST_WHITE_MOVE
             self.previous_move = ('', '')
             return -99
-        # If the current player is white
-        elif self.is_white_move:
-            # Only valid moves will be played
-            if (y, x) in self.get_valid_moves_white():
-                self.gameboard[y][x] = 1
-                flips = self.flip_white(y, x)
-                self.is_white_move = not self.is_white_move
-                self.previous_move = (y, x)
-                return flips
-            # If move is not valid, gameboard will not change.
-            else:
-                return False
+        # Only valid moves will be played, using the captures found while generating the moves
+        elif (y, x) in moves:
+            self._history.append((self.previous_move, self.is_white_move, (y, x), moves[(y, x)],
+                                  self._valid_moves, self.zobrist))
+            flips = self.place(y, x, color, moves[(y, x)])
+            self.is_white_move = not self.is_white_move
+            self.zobrist ^= ZOBRIST_WHITE_MOVE
+            self.previous_move = (y, x)
+            return flips
+        # If move is not valid, gameboard will not change.
         else:
-            # Only valid moves will be played
-            if (y, x) in self.get_valid_moves_black():
-                self.gameboard[y][x] = -1
-                flips = self.flip_black(y, x)
-                self.is_white_move = not self.is_white_move
-                self.previous_move = (y, x)
-                return flips
-            # If move is not valid, gameboard will not change.
-            else:
-                return False
+            return False
+
+    def undo_move(self) -> Any:
+        """
+        Take back the last move played with make_move, restoring the previous game state exactly,
+        and return that move (('', '') for a pass).
+
+        Preconditions:
+            - at least one move has been played with make_move since this game was created
+        """
+        previous_move, is_white_move, move, captured, valid_moves, zobrist = self._history.pop()
+        self.is_white_move = is_white_move
+        self.previous_move = previous_move
+        self.zobrist = zobrist
+
+        if move is None:
+            return ('', '')
+
+        color = 1 if is_white_move else -1
+        y, x = move
+        self.gameboard[y][x] = 0
+        self.empty_count += 1
+        for i, j in captured:
+            self.gameboard[i][j] = -color
+
+        if color == 1:
+            self.white_count -= 1 + len(captured)
+            self.black_count += len(captured)
+        else:
+            self.black_count -= 1 + len(captured)
+            self.white_count += len(captured)
+
+        self._valid_moves = valid_moves
+        return move
 
     def score(self) -> tuple:
         """
         Return the current score in a tuple: (Number of White pieces: Number of Black pieces)
         """
-        white_count = 0
-        black_count = 0
-        for i in range(0, 8):
-            for j in range(0, 8):
-                if self.gameboard[i][j] == 0:
-                    pass
-                elif self.gameboard[i][j] == 1:
-                    white_count += 1
-                else:
-                    black_count += 1
-        return (white_count, black_count)
+        return (self.white_count, self.black_count)
 
     def get_winner(self) -> int:
         """
@@ -157,12 +254,7 @@ class Othello:
         """
         Check if the board has been fully filled.
         """
-        for i in range(0, 8):
-            for j in range(0, 8):
-                if self.gameboard[i][j] == 0:
-                    return False
-
-        return True
+        return self.empty_count == 0
 
     def print(self) -> Any:
         """
@@ -178,316 +270,83 @@ class Othello:
         """
         Get valid moves for white
         """
-        possible_moves = set()
-        for i in range(0, 8):
-            for j in range(0, 8):
-                possible_moves = possible_moves.union(self.possible_move_white(i, j))
-
-        return possible_moves
+        return set(self.get_valid_moves_and_flips(1))
 
     def get_valid_moves_black(self) -> set:
         """
         Get valid moves for black
         """
-        possible_moves = set()
+        return set(self.get_valid_moves_and_flips(-1))
+
+    def get_valid_moves_and_flips(self, color: int) -> dict:
+        """
+        Return a dictionary mapping every valid move of color (1 = white, -1 = black) to the list
+        of the squares it captures.
+
+        Each empty square is visited once, walking the 8 directions from it. The result is cached
+        until the gameboard changes, and must not be modified.
+        """
+        if color in self._valid_moves:
+            return self._valid_moves[color]
+
+        moves = {}
         for i in range(0, 8):
             for j in range(0, 8):
-                possible_moves = possible_moves.union(self.possible_move_black(i, j))
+                if self.gameboard[i][j] == 0:
+                    captured = self.get_flips(i, j, color)
+                    if captured != []:
+                        moves[(i, j)] = captured
 
-        return possible_moves
+        self._valid_moves[color] = moves
+        return moves
 
     #####################################################################
     # Helper functions 2
     #####################################################################
-    def possible_move_white(self, y: int, x: int) -> set:
-        """
-        Return a list of possible moves for a specific grid self.gameboard[y = row][x = column]
-        """
-        possible_so_far = set()
-
-        if self.gameboard[y][x] == 1:
-            # check squares on same row
-            # squares on the same row on the left
-            for i in range(0, x):
-                if self.gameboard[y][i] == 0 and \
-                        all(self.gameboard[y][j] == -1 for j in range(i + 1, x)) and \
-                        any(self.gameboard[y][j] == -1 for j in range(i + 1, x)):
-                    possible_so_far = possible_so_far.union({(y, i)})
-
-            # squares on the same row on the right
-            for i in range(x + 1, 8):
-                if self.gameboard[y][i] == 0 and \
-                        all(self.gameboard[y][j] == -1 for j in range(x + 1, i)) and \
-                        any(self.gameboard[y][j] == -1 for j in range(x + 1, i)):
-                    possible_so_far = possible_so_far.union({(y, i)})
-
-            # check squares on same column
-            # squares on the same column on the top
-            for i in range(0, y):
-                if self.gameboard[i][x] == 0 and \
-                        all(self.gameboard[j][x] == -1 for j in range(i + 1, y)) and \
-                        any(self.gameboard[j][x] == -1 for j in range(i + 1, y)):
-                    possible_so_far = possible_so_far.union({(i, x)})
-
-            # squares on the same column on the bottom
-            for i in range(y + 1, 8):
-                if self.gameboard[i][x] == 0 and \
-                        all(self.gameboard[j][x] == -1 for j in range(y + 1, i)) and \
-                        any(self.gameboard[j][x] == -1 for j in range(y + 1, i)):
-                    possible_so_far = possible_so_far.union({(i, x)})
-
-            # check squares on first diagonal '\'
-            # check squares on the left and on the top
-            for i in range(1, min(x, y) + 1):
-                if self.gameboard[y - i][x - i] == 0 and \
-                        all(self.gameboard[y - j][x - j] == -1 for j in range(1, i)) and \
-                        any(self.gameboard[y - j][x - j] == -1 for j in range(1, i)):
-                    possible_so_far = possible_so_far.union({(y - i, x - i)})
-
-            # check squares on the right and on the bottom
-            for i in range(1, min(7 - x, 7 - y) + 1):
-                if self.gameboard[y + i][x + i] == 0 and \
-                        all(self.gameboard[y + j][x + j] == -1 for j in range(1, i)) and \
-                        any(self.gameboard[y + j][x + j] == -1 for j in range(1, i)):
-                    possible_so_far = possible_so_far.union({(y + i, x + i)})
-
-            # check squares on first diagonal '/'
-            # check squares on the left and on the bottom
-            for i in range(1, min(7 - y, x) + 1):
-                if self.gameboard[y + i][x - i] == 0 and \
-                        all(self.gameboard[y + j][x - j] == -1 for j in range(1, i)) and \
-                        any(self.gameboard[y + j][x - j] == -1 for j in range(1, i)):
-                    possible_so_far = possible_so_far.union({(y + i, x - i)})
-
-            # check squares on the right and on the top
-            for i in range(1, min(y, 7 - x) + 1):
-                if self.gameboard[y - i][x + i] == 0 and \
-                        all(self.gameboard[y - j][x + j] == -1 for j in range(1, i)) and \
-                        any(self.gameboard[y - j][x + j] == -1 for j in range(1, i)):
-                    possible_so_far = possible_so_far.union({(y - i, x + i)})
-
-        return possible_so_far
-
-    def possible_move_black(self, y: int, x: int) -> set:
-        """
-        Return a list of possible moves for a specific grid self.gameboard[y = row][x = column]
-        """
-        possible_so_far = set()
-
-        if self.gameboard[y][x] == -1:
-            # check squares on same row
-            # squares on the same row on the left
-            for i in range(0, x):
-                if self.gameboard[y][i] == 0 and \
-                        all(self.gameboard[y][j] == 1 for j in range(i + 1, x)) and \
-                        any(self.gameboard[y][j] == 1 for j in range(i + 1, x)):
-                    possible_so_far = possible_so_far.union({(y, i)})
-            # squares on the same row on the right
-            for i in range(x + 1, 8):
-                if self.gameboard[y][i] == 0 and \
-                        all(self.gameboard[y][j] == 1 for j in range(x + 1, i)) and \
-                        any(self.gameboard[y][j] == 1 for j in range(x + 1, i)):
-                    possible_so_far = possible_so_far.union({(y, i)})
-
-            # check squares on same column
-            # squares on the same column on the top
-            for i in range(0, y):
-                if self.gameboard[i][x] == 0 and \
-                        all(self.gameboard[j][x] == 1 for j in range(i + 1, y)) and \
-                        any(self.gameboard[j][x] == 1 for j in range(i + 1, y)):
-                    possible_so_far = possible_so_far.union({(i, x)})
-            # squares on the same column on the bottom
-            for i in range(y + 1, 8):
-                if self.gameboard[i][x] == 0 and \
-                        all(self.gameboard[j][x] == 1 for j in range(y + 1, i)) and \
-                        any(self.gameboard[j][x] == 1 for j in range(y + 1, i)):
-                    possible_so_far = possible_so_far.union({(i, x)})
-
-            # check squares on first diagonal '\'
-            # check squares on the left and on the top
-            for i in range(1, min(x, y) + 1):
-                if self.gameboard[y - i][x - i] == 0 and \
-                        all(self.gameboard[y - j][x - j] == 1 for j in range(1, i)) and \
-                        any(self.gameboard[y - j][x - j] == 1 for j in range(1, i)):
-                    possible_so_far = possible_so_far.union({(y - i, x - i)})
-            # check squares on the right and on the bottom
-            for i in range(1, min(7 - x, 7 - y) + 1):
-                if self.gameboard[y + i][x + i] == 0 and \
-                        all(self.gameboard[y + j][x + j] == 1 for j in range(1, i)) and \
-                        any(self.gameboard[y + j][x + j] == 1 for j in range(1, i)):
-                    possible_so_far = possible_so_far.union({(y + i, x + i)})
-
-            # check squares on first diagonal '/'
-            # check squares on the left and on the bottom
-            for i in range(1, min(7 - y, x) + 1):
-                if self.gameboard[y + i][x - i] == 0 and \
-                        all(self.gameboard[y + j][x - j] == 1 for j in range(1, i)) and \
-                        any(self.gameboard[y + j][x - j] == 1 for j in range(1, i)):
-                    possible_so_far = possible_so_far.union({(y + i, x - i)})
-            # check squares on the right and on the top
-            for i in range(1, min(y, 7 - x) + 1):
-                if self.gameboard[y - i][x + i] == 0 and \
-                        all(self.gameboard[y - j][x + j] == 1 for j in range(1, i)) and \
-                        any(self.gameboard[y - j][x + j] == 1 for j in range(1, i)):
-                    possible_so_far = possible_so_far.union({(y - i, x + i)})
-
-        return possible_so_far
-
-    def flip_white(self, y: int, x: int) -> int:
-        """
-        Only call flip with make_move
-        flip the color of the pieces captured
-        return how many opponent pieces are flipped
+    def get_flips(self, y: int, x: int, color: int) -> list:
+        """
+        Return the list of the squares captured by color (1 = white, -1 = black) when playing
+        at self.gameboard[y = row][x = column]
         """
-        flips = 0
-
-        if self.gameboard[y][x] == 1:
-            # check squares on same row
-            for i in range(0, x):
-                if self.gameboard[y][i] == 1 and \
-                        all(self.gameboard[y][j] == -1 for j in range(i + 1, x)) and \
-                        any(self.gameboard[y][j] == -1 for j in range(i + 1, x)):
-                    for j in range(i + 1, x):
-                        self.gameboard[y][j] = 1
-                        flips += 1
-            for i in range(x + 1, 8):
-                if self.gameboard[y][i] == 1 and \
-                        all(self.gameboard[y][j] == -1 for j in range(x + 1, i)) and \
-                        any(self.gameboard[y][j] == -1 for j in range(x + 1, i)):
-                    for j in range(x + 1, i):
-                        self.gameboard[y][j] = 1
-                        flips += 1
-
-            # check squares on same column
-            for i in range(0, y):
-                if self.gameboard[i][x] == 1 and \
-                        all(self.gameboard[j][x] == -1 for j in range(i + 1, y)) and \
-                        any(self.gameboard[j][x] == -1 for j in range(i + 1, y)):
-                    for j in range(i + 1, y):
-                        self.gameboard[j][x] = 1
-                        flips += 1
-            for i in range(y + 1, 8):
-                if self.gameboard[i][x] == 1 and \
-                        all(self.gameboard[j][x] == -1 for j in range(y + 1, i)) and \
-                        any(self.gameboard[j][x] == -1 for j in range(y + 1, i)):
-                    for j in range(y + 1, i):
-                        self.gameboard[j][x] = 1
-                        flips += 1
-
-            # check squares on first diagonal '\'
-            # check squares on the left and on the top
-            for i in range(1, min(x, y) + 1):
-                if self.gameboard[y - i][x - i] == 1 and \
-                        all(self.gameboard[y - j][x - j] == -1 for j in range(1, i)) and \
-                        any(self.gameboard[y - j][x - j] == -1 for j in range(1, i)):
-                    for j in range(1, i):
-                        self.gameboard[y - j][x - j] = 1
-                        flips += 1
-            # check squares on the right and on the bottom
-            for i in range(1, min(7 - x, 7 - y) + 1):
-                if self.gameboard[y + i][x + i] == 1 and \
-                        all(self.gameboard[y + j][x + j] == -1 for j in range(1, i)) and \
-                        any(self.gameboard[y + j][x + j] == -1 for j in range(1, i)):
-                    for j in range(1, i):
-                        self.gameboard[y + j][x + j] = 1
-                        flips += 1
-
-            # check squares on first diagonal '/'
-            # check squares on the left and on the bottom
-            for i in range(1, min(7 - y, x) + 1):
-                if self.gameboard[y + i][x - i] == 1 and \
-                        all(self.gameboard[y + j][x - j] == -1 for j in range(1, i)) and \
-                        any(self.gameboard[y + j][x - j] == -1 for j in range(1, i)):
-                    for j in range(1, i):
-                        self.gameboard[y + j][x - j] = 1
-                        flips += 1
-            # check squares on the right and on the top
-            for i in range(1, min(y, 7 - x) + 1):
-                if self.gameboard[y - i][x + i] == 1 and \
-                        all(self.gameboard[y - j][x + j] == -1 for j in range(1, i)) and \
-                        any(self.gameboard[y - j][x + j] == -1 for j in range(1, i)):
-                    for j in range(1, i):
-                        self.gameboard[y - j][x + j] = 1
-                        flips += 1
-
-        return flips
-
-    def flip_black(self, y: int, x: int) -> int:
-        """
-        Only call flip with make_move
-        flip the color of the pieces captured
+        captured = []
+        for dy, dx in DIRECTIONS:
+            line = []
+            i, j = y + dy, x + dx
+            # walk over the opponent pieces in this direction ...
+            while 0 <= i < 8 and 0 <= j < 8 and self.gameboard[i][j] == -color:
+                line.append((i, j))
+                i, j = i + dy, j + dx
+            # ... which are captured if the line ends with a piece of color
+            if line != [] and 0 <= i < 8 and 0 <= j < 8 and self.gameboard[i][j] == color:
+                captured.extend(line)
+
+        return captured
+
+    def place(self, y: int, x: int, color: int, captured: list) -> int:
+        """
+        Only call place with make_move
+        put a piece of color on (y, x), flip the pieces captured
         return how many opponent pieces are flipped
         """
-        flips = 0
-        if self.gameboard[y][x] == -1:
-            # check squares on same row
-            for i in range(0, x):
-                if self.gameboard[y][i] == -1 and \
-                        all(self.gameboard[y][j] == 1 for j in range(i + 1, x)) and \
-                        any(self.gameboard[y][j] == 1 for j in range(i + 1, x)):
-                    for j in range(i + 1, x):
-                        self.gameboard[y][j] = -1
-                        flips += 1
-            for i in range(x + 1, 8):
-                if self.gameboard[y][i] == -1 and \
-                        all(self.gameboard[y][j] == 1 for j in range(x + 1, i)) and \
-                        any(self.gameboard[y][j] == 1 for j in range(x + 1, i)):
-                    for j in range(x + 1, i):
-                        self.gameboard[y][j] = -1
-                        flips += 1
-
-            # check squares on same column
-            for i in range(0, y):
-                if self.gameboard[i][x] == -1 and \
-                        all(self.gameboard[j][x] == 1 for j in range(i + 1, y)) and \
-                        any(self.gameboard[j][x] == 1 for j in range(i + 1, y)):
-                    for j in range(i + 1, y):
-                        self.gameboard[j][x] = -1
-                        flips += 1
-            for i in range(y + 1, 8):
-                if self.gameboard[i][x] == -1 and \
-                        all(self.gameboard[j][x] == 1 for j in range(y + 1, i)) and \
-                        any(self.gameboard[j][x] == 1 for j in range(y + 1, i)):
-                    for j in range(y + 1, i):
-                        self.gameboard[j][x] = -1
-                        flips += 1
-
-            # check squares on first diagonal '\'
-            # check squares on the left and on the top
-            for i in range(1, min(x, y) + 1):
-                if self.gameboard[y - i][x - i] == -1 and \
-                        all(self.gameboard[y - j][x - j] == 1 for j in range(1, i)) and \
-                        any(self.gameboard[y - j][x - j] == 1 for j in range(1, i)):
-                    for j in range(1, i):
-                        self.gameboard[y - j][x - j] = -1
-                        flips += 1
-            # check squares on the right and on the bottom
-            for i in range(1, min(7 - x, 7 - y) + 1):
-                if self.gameboard[y + i][x + i] == -1 and \
-                        all(self.gameboard[y + j][x + j] == 1 for j in range(1, i)) and \
-                        any(self.gameboard[y + j][x + j] == 1 for j in range(1, i)):
-                    for j in range(1, i):
-                        self.gameboard[y + j][x + j] = -1
-                        flips += 1
-
-            # check squares on first diagonal '/'
-            # check squares on the left and on the bottom
-            for i in range(1, min(7 - y, x) + 1):
-                if self.gameboard[y + i][x - i] == -1 and \
-                        all(self.gameboard[y + j][x - j] == 1 for j in range(1, i)) and \
-                        any(self.gameboard[y + j][x - j] == 1 for j in range(1, i)):
-                    for j in range(1, i):
-                        self.gameboard[y + j][x - j] = -1
-                        flips += 1
-            # check squares on the right and on the top
-            for i in range(1, min(y, 7 - x) + 1):
-                if self.gameboard[y - i][x + i] == -1 and \
-                        all(self.gameboard[y - j][x + j] == 1 for j in range(1, i)) and \
-                        any(self.gameboard[y - j][x + j] == 1 for j in range(1, i)):
-                    for j in range(1, i):
-                        self.gameboard[y - j][x + j] = -1
-                        flips += 1
-        return flips
+        self.gameboard[y][x] = color
+        self.empty_count -= 1
+        self._valid_moves = {}
+        flipped = 0
+        for i, j in captured:
+            self.gameboard[i][j] = color
+            flipped |= 1 << (i * 8 + j)
+        # the side to move is not changed here
+        self.zobrist = zobrist_update(self.zobrist, color == 1, y * 8 + x, flipped) ^ \
+            ZOBRIST_WHITE_MOVE
+
+        if color == 1:
+            self.white_count += 1 + len(captured)
+            self.black_count -= len(captured)
+        else:
+            self.black_count += 1 + len(captured)
+            self.white_count -= len(captured)
+
+        return len(captured)
 
 
 # Testing
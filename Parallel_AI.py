@@ -0,0 +1,135 @@
+"""
+Objective: This file contains the parallel search used by the computer players on machines with
+           many CPU cores. The moves at the root of a GameTree are split between the processes of
+           a pool: each process searches the subtree of one move with alpha-beta pruning, and the
+           best move is chosen from their exact scores.
+
+           The pool is created once and reused by every search, so that starting the processes is
+           only paid for once. Each process keeps its own transposition table and move ordering
+           between searches.
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+
+from Bitboard_Game import Position
+from GameTree_Game import GameTree
+from Ordering_AI import MoveOrdering
+from Transposition_AI import EXACT, TranspositionTable
+
+# The pool shared by all parallel searches, created by get_pool
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+
+# The transposition table and move ordering of a worker process, created by _init_worker
+_worker_table: Optional[TranspositionTable] = None
+_worker_ordering: Optional[MoveOrdering] = None
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Return the shared pool of worker processes, creating it (or replacing it, if it has a
+    different number of workers) if needed.
+    """
+    global _pool, _pool_workers
+
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """
+    Stop the worker processes of the shared pool, if there is one.
+    """
+    global _pool, _pool_workers
+
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+        _pool_workers = 0
+
+
+def _init_worker() -> None:
+    """
+    Initialize the transposition table and move ordering of a worker process.
+    """
+    global _worker_table, _worker_ordering
+
+    _worker_table = TranspositionTable()
+    _worker_ordering = MoveOrdering()
+
+
+def _search_position(position: Position, game_type: type, depth: int) -> float:
+    """
+    Return the score of position, searched to depth by GameTree.minimaxab in a worker process.
+
+    The window is not narrowed by the other moves of the root, so the score is exact.
+    """
+    _worker_table.new_search()
+    _worker_ordering.new_search()
+
+    tree = GameTree(game_type.from_position(position))
+    tree.generate_moves_quick(depth, _worker_table, ordering=_worker_ordering)
+    return tree.score
+
+
+def generate_moves_parallel(tree: GameTree, d: int, workers: int, table: Any = None,
+                            ordering: Any = None) -> None:
+    """
+    Extend tree to depth d like GameTree.generate_moves_quick, but search the subtree of each
+    move at the root in a different worker process.
+
+    The subtrees of the root are given the scores found by the workers, and the result is stored
+    in table. The deeper levels of the tree are not built in this process (existing subtrees of
+    the root lose theirs, which are from an older search). If the player to move has no valid
+    moves, or d < 2, tree is searched in this process instead.
+
+    ordering decides the order of the subtrees of the root, and so the best move when several
+    moves have the same score, like in generate_moves_quick.
+    """
+    game = tree.game
+    moves = game.get_valid_moves_now()
+    if moves == [] or d < 2 or workers < 2:
+        tree.generate_moves_quick(d, table, ordering=ordering)
+        return None
+
+    table_move = None
+    if table is not None:
+        entry = table.lookup(tree.position.zobrist)
+        if entry is not None and entry.best_move in moves:
+            table_move = entry.best_move
+
+    if ordering is not None:
+        moves = ordering.order(game, moves, d, table_move)
+    elif table_move is not None:
+        moves.remove(table_move)
+        moves.insert(0, table_move)
+
+    pool = get_pool(workers)
+    searches = []
+    for move in moves:
+        subtree = tree.find_subtree_by_move(move)
+        if subtree is None:
+            game.make_move(move[0], move[1])
+            subtree = GameTree(game)
+            game.undo_move()
+        else:
+            subtree.release_subtrees()
+
+        future = pool.submit(_search_position, subtree.position, type(game), d - 1)
+        searches.append((subtree, future))
+
+    # The subtrees are added again in the order they were searched, like in minimaxab
+    tree.release_subtrees()
+    for subtree, future in searches:
+        subtree.score = future.result()
+        subtree.searched_depth, subtree.bound = d - 1, EXACT
+        tree.add_subtree(subtree)
+
+    tree.searched_depth, tree.bound = d, EXACT
+    if table is not None:
+        table.store(tree.position.zobrist, d, tree.score, EXACT, tree.get_best_move())
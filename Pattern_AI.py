@@ -0,0 +1,283 @@
+"""
+Objective: This file contains the pattern evaluation of the computer players. Instead of
+           scoring each square on its own (like BOARD_SCORE), a position is scored by looking up
+           the contents of a few groups of squares (patterns) in tables of weights:
+           - 'edge': the 8 squares of an edge
+           - 'corner': the 3x3 squares in a corner
+           - 'diagonal': the 8 squares of a long diagonal
+
+           The contents of the squares of a pattern (empty, white or black) are read as the
+           digits of a number in base 3, the index of its weight. Every rotation and reflection
+           of a pattern on the board uses the same table, so each position is scored with 10
+           table reads. Since the value of a pattern changes over the game, there is a set of
+           tables for each phase of the game, decided by the number of pieces on the board.
+
+           The weights are fit by least squares to the final difference in pieces of self-play
+           games (see GameEngine.play), and stored in a compact binary file.
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from typing import Any, Optional
+
+import numpy as np
+
+from Bitboard_Game import FULL, PERMUTATIONS, BitboardOthello, popcount
+from Evaluation_AI import end_score
+
+# The squares of each pattern, in the order of the digits of its index (the first square is the
+# lowest digit), in one of its positions on the board
+PATTERNS = {'edge': [x for x in range(0, 8)],
+            'corner': [y * 8 + x for y in range(0, 3) for x in range(0, 3)],
+            'diagonal': [y * 8 + y for y in range(0, 8)]}
+
+# The phases of the game, by the number of pieces on the board: phase i is for positions with
+# PHASE_STARTS[i] pieces or more
+PHASE_STARTS = [0, 20, 36, 50]
+N_PHASES = len(PHASE_STARTS)
+PHASE = [max(i for i in range(0, N_PHASES) if PHASE_STARTS[i] <= count) for count in range(0, 65)]
+
+# The file format: the header is (magic, version, number of phases, number of weights per phase,
+# scale), followed by the weights compressed with zlib, as little-endian 16-bit integers equal to
+# weight * scale
+MAGIC = b'OTHP'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIH')
+SCALE = 256
+
+# The weights shipped with the game
+DEFAULT_PATTERNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns.bin')
+
+# The default evaluator, loaded by default_patterns
+_default_patterns: Any = None
+
+
+def _pattern_instances() -> list:
+    """
+    Return (offset of the table of the pattern, squares) for every position of every pattern on
+    the board. The weights of a phase are the tables of PATTERNS one after the other, followed by
+    a constant.
+    """
+    instances = []
+    offset = 0
+    for pattern in PATTERNS.values():
+        seen = []
+        for permutation in PERMUTATIONS:
+            moved = [permutation[square] for square in pattern]
+            if set(moved) not in seen:
+                seen.append(set(moved))
+                instances.append((offset, moved))
+        offset += 3 ** len(pattern)
+    return instances
+
+
+INSTANCES = _pattern_instances()
+N_WEIGHTS = sum(3 ** len(pattern) for pattern in PATTERNS.values()) + 1
+CONSTANT = N_WEIGHTS - 1
+
+# The indices of all the patterns are computed at once, packed in one integer with
+# FIELD_BITS bits for each pattern on the board: for each row of the board and each byte of a
+# bitboard, ROW_INDICES gives the part of every index made by the white pieces of that row
+FIELD_BITS = 16
+FIELD_MASK = (1 << FIELD_BITS) - 1
+ROW_INDICES = [[sum(3 ** i << (FIELD_BITS * k)
+                    for k, (_, moved) in enumerate(INSTANCES)
+                    for i, square in enumerate(moved)
+                    if square >> 3 == row and byte >> (square & 7) & 1)
+                for byte in range(0, 256)]
+               for row in range(0, 8)]
+FIELDS = [(FIELD_BITS * k, offset) for k, (offset, _) in enumerate(INSTANCES)]
+
+
+def pattern_weights(white: int, black: int) -> list:
+    """
+    Return the indices of the weights which score the position with the given bitboards: one
+    for each pattern on the board, and the constant.
+    """
+    packed = _packed_indices(white, black)
+    return [offset + (packed >> shift & FIELD_MASK) for shift, offset in FIELDS] + [CONSTANT]
+
+
+def _packed_indices(white: int, black: int) -> int:
+    """
+    Return the indices of the patterns on the board in the position with the given bitboards,
+    packed in one integer (see ROW_INDICES).
+    """
+    # A black piece is the digit 2, so it adds twice the index of a white piece on its square
+    packed = 0
+    for row in range(0, 8):
+        packed += ROW_INDICES[row][white >> (row * 8) & 255]
+        packed += 2 * ROW_INDICES[row][black >> (row * 8) & 255]
+    return packed
+
+
+class PatternEvaluator:
+    """
+    An evaluation with a table of weights for each pattern and phase of the game.
+
+    Scores are from white's point of view, in pieces: the expected difference in pieces at the
+    end of the game.
+
+    Instance Attributes:
+        - weights: the weights of each phase, N_WEIGHTS for each
+    """
+    weights: list
+
+    def __init__(self, weights: list) -> None:
+        self.weights = weights
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATTERNS_PATH) -> PatternEvaluator:
+        """
+        Return the evaluator stored in the file at path by save.
+        """
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        magic, version, n_phases, n_weights, scale = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or n_phases != N_PHASES or n_weights != N_WEIGHTS:
+            raise ValueError(f'{path} is not a pattern file of version {VERSION}')
+
+        values = np.frombuffer(zlib.decompress(data[HEADER.size:]), dtype='<i2') / scale
+        return cls([values[i * n_weights:(i + 1) * n_weights].tolist()
+                    for i in range(0, n_phases)])
+
+    def save(self, path: str = DEFAULT_PATTERNS_PATH) -> None:
+        """
+        Write this evaluator to a file at path. The weights are rounded to multiples of
+        1 / SCALE.
+        """
+        values = np.clip(np.round(np.array(self.weights) * SCALE), -32768, 32767)
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, N_PHASES, N_WEIGHTS, SCALE))
+            file.write(zlib.compress(values.astype('<i2').tobytes(), 9))
+
+    def evaluate(self, white: int, black: int) -> float:
+        """
+        Return the score of the position with the given bitboards. A full board is scored with
+        end_score.
+        """
+        filled = white | black
+        if filled == FULL:
+            return end_score(popcount(white), popcount(black))
+
+        packed = _packed_indices(white, black)
+        weights = self.weights[PHASE[popcount(filled)]]
+        score = weights[CONSTANT]
+        for shift, offset in FIELDS:
+            score += weights[offset + (packed >> shift & FIELD_MASK)]
+        return score
+
+
+def default_patterns() -> Optional[PatternEvaluator]:
+    """
+    Return the evaluator shipped with the game (loaded once), or None if there is no weights
+    file.
+    """
+    global _default_patterns
+
+    if _default_patterns is None and os.path.exists(DEFAULT_PATTERNS_PATH):
+        _default_patterns = PatternEvaluator.load(DEFAULT_PATTERNS_PATH)
+    return _default_patterns
+
+
+####################################################################################
+# Training
+####################################################################################
+def self_play(n_games: int, depth: int = 2, rnd: float = 0.1) -> tuple:
+    """
+    Play n_games games between two NegamaxPlayers searching to depth with the 'features'
+    evaluation, which move randomly with a chance of rnd (so that the games are different), and
+    return the positions of the games and the final difference in pieces (white - black) of the
+    game of each position.
+    """
+    # GameEngine_AI uses this file through Search_AI
+    from GameEngine_AI import GameEngine, NegamaxPlayer
+
+    positions = []
+    targets = []
+    for _ in range(0, n_games):
+        white = NegamaxPlayer(1, depth, 64, depth, rnd, evaluation='features')
+        black = NegamaxPlayer(-1, depth, 64, depth, rnd, evaluation='features')
+        record = []
+        GameEngine(white, black, BitboardOthello).play(verbose=False, record=record)
+
+        # The last position is the end of the game
+        final = record.pop()
+        result = popcount(final.white) - popcount(final.black)
+        positions.extend(record)
+        targets.extend([result] * len(record))
+    return (positions, targets)
+
+
+def fit(positions: list, targets: list, regularization: float = 50.0,
+        iterations: int = 200) -> PatternEvaluator:
+    """
+    Return the evaluator whose scores of positions are closest to targets (least squares), with
+    every weight pulled towards 0 by regularization (so that patterns seen in few positions get
+    small weights).
+
+    The weights of each phase are fit separately, with the conjugate gradient method on the
+    normal equations.
+    """
+    indices = np.array([pattern_weights(p.white, p.black) for p in positions], dtype=np.int64)
+    phases = np.array([PHASE[popcount(p.white | p.black)] for p in positions])
+    targets = np.array(targets, dtype=np.float64)
+
+    weights = []
+    for phase in range(0, N_PHASES):
+        rows = indices[phases == phase]
+        y = targets[phases == phase]
+        weights.append(_least_squares(rows, y, regularization, iterations).tolist())
+    return PatternEvaluator(weights)
+
+
+def _least_squares(rows: np.ndarray, y: np.ndarray, regularization: float,
+                   iterations: int) -> np.ndarray:
+    """
+    Return the weights w minimizing |Aw - y|^2 + regularization * |w|^2, where A is the 0-1
+    matrix with a 1 in each row i at the columns rows[i].
+    """
+    def normal(w: np.ndarray) -> np.ndarray:
+        # (A^T A + regularization * I) w, without building A
+        residual = w[rows].sum(axis=1)
+        return np.bincount(rows.ravel(), weights=np.repeat(residual, rows.shape[1]),
+                           minlength=N_WEIGHTS) + regularization * w
+
+    w = np.zeros(N_WEIGHTS)
+    if len(y) == 0:
+        return w
+
+    r = np.bincount(rows.ravel(), weights=np.repeat(y, rows.shape[1]), minlength=N_WEIGHTS)
+    p = r.copy()
+    r_norm = r @ r
+    for _ in range(0, iterations):
+        q = normal(p)
+        step = r_norm / (p @ q)
+        w += step * p
+        r -= step * q
+        new_norm = r @ r
+        if new_norm < 1e-12:
+            break
+        p = r + (new_norm / r_norm) * p
+        r_norm = new_norm
+    return w
+
+
+# Testing
+if __name__ == '__main__':
+    import sys
+    import time
+
+    start = time.time()
+    train_positions, train_targets = self_play(int(sys.argv[1]) if len(sys.argv) > 1 else 4000)
+    print(f'{len(train_positions)} positions in {time.time() - start:.1f}s')
+
+    start = time.time()
+    evaluator = fit(train_positions, train_targets)
+    evaluator.save()
+    print(f'fit in {time.time() - start:.1f}s')
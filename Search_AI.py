@@ -0,0 +1,344 @@
+"""
+Objective: This file contains the search engine used by the lean computer players. It runs
+           alpha-beta negamax on a single board, making and undoing moves, and returns the best
+           move and its score without building a GameTree. Only the principal variation (the
+           sequence of best moves for both players) is kept.
+
+           By default, the positions are scored with the same evaluation as GameTree (see
+           Evaluation_AI), so the scores are comparable, except that finished games are scored as
+           wins, losses or draws. The full evaluation (with mobility and frontier pieces) can be
+           used instead, either one position at a time or for all the leaves below a position at
+           once, with NumPy, and so can the full evaluation plus stable pieces, kept up to date as
+           moves are made and undone, or tables of patterns trained on self-play games.
+
+           Searches can be limited by a wall-clock time budget with iterative deepening.
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+import math
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+from Bitboard_Game import BitboardOthello, flips
+from Evaluation_AI import FeatureBoard, end_score, evaluate, evaluate_batch, evaluate_features, \
+    leaf_score
+from Pattern_AI import default_patterns
+from Transposition_AI import EXACT, LOWER, UPPER, TranspositionTable
+
+
+# The evaluations a Searcher can use
+EVALUATIONS = ('leaf', 'full', 'batch', 'features', 'patterns')
+
+# With the 'batch' evaluation, positions with fewer valid moves than this are searched one move at
+# a time, since alpha-beta pruning then skips more work than scoring all the moves at once saves
+BATCH_MIN_MOVES = 8
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its deadline has passed."""
+
+
+class Deadline:
+    """
+    The point in time at which a search has to stop.
+
+    A deadline can also be expired early (e.g. by the user interface, from another thread), which
+    stops the search as soon as possible.
+
+    Instance Attributes:
+        - end: the time (as given by time.monotonic) at which the deadline expires
+    """
+    # Private Instance Attributes:
+    #   - _expired: whether expire was called
+    end: float
+    _expired: bool
+
+    def __init__(self, seconds: Optional[float] = None) -> None:
+        """
+        Initialize a deadline seconds from now; a deadline without seconds only expires when
+        expire is called.
+        """
+        if seconds is None:
+            self.end = math.inf
+        else:
+            self.end = time.monotonic() + seconds
+        self._expired = False
+
+    def expire(self) -> None:
+        """
+        Expire this deadline now.
+        """
+        self._expired = True
+
+    def expired(self) -> bool:
+        """
+        Return whether this deadline has passed.
+        """
+        return self._expired or time.monotonic() >= self.end
+
+
+class Searcher:
+    """
+    An alpha-beta negamax search engine.
+
+    Inside the search, scores are from the point of view of the player to move; search returns
+    scores from white's point of view, like GameTree.
+
+    Instance Attributes:
+        - table: an optional TranspositionTable, which can be shared by many searches
+        - ordering: an optional MoveOrdering (see Ordering_AI); without one, only the best move
+                    stored in the table is searched first
+        - evaluation: how the leaves are scored: 'leaf' (Evaluation_AI.leaf_score, like
+                      GameTree), 'full' (Evaluation_AI.evaluate), 'batch' (the same scores as
+                      'full', but the leaves below each position searched to depth 1 are scored
+                      together by Evaluation_AI.evaluate_batch), 'features'
+                      (Evaluation_AI.evaluate_features, which also counts stable pieces, on a
+                      FeatureBoard updated as moves are made) or 'patterns' (the pattern tables
+                      of Pattern_AI.default_patterns)
+        - nodes: the number of positions visited by the last search
+        - pv: the principal variation found by the last search
+        - depth: the depth of the last completed search
+    """
+    # Private Instance Attributes:
+    #   - _pv: the principal variation found from each ply of the current search
+    #   - _deadline: the deadline of the current search, or None
+    #   - _patterns: the PatternEvaluator of the 'patterns' evaluation, or None
+    table: Any
+    ordering: Any
+    evaluation: str
+    nodes: int
+    pv: list
+    depth: int
+    _pv: list
+    _deadline: Optional[Deadline]
+    _patterns: Any
+
+    def __init__(self, table: Any = None, ordering: Any = None, evaluation: str = 'leaf') -> None:
+        if evaluation not in EVALUATIONS:
+            raise ValueError(f'Unknown evaluation: {evaluation}')
+
+        self.table = table
+        self.ordering = ordering
+        self.evaluation = evaluation
+        self.nodes = 0
+        self.pv = []
+        self.depth = 0
+        self._pv = []
+        self._deadline = None
+
+        self._patterns = None
+        if evaluation == 'patterns':
+            self._patterns = default_patterns()
+            if self._patterns is None:
+                raise ValueError('The pattern evaluation needs a weights file')
+
+    def search(self, game: Any, depth: int) -> tuple:
+        """
+        Search game to depth and return the best move for the player to move and its score, from
+        white's point of view.
+
+        The best move is ('', '') if the player to move has to pass. game is not changed.
+
+        Preconditions:
+            - depth >= 1
+        """
+        board = self._board(game)
+        self.nodes = 0
+        if self.table is not None:
+            self.table.new_search()
+        if self.ordering is not None:
+            self.ordering.new_search()
+
+        return self._search_root(board, depth)
+
+    def iterative_deepening(self, game: Any, max_depth: int, deadline: Deadline) -> tuple:
+        """
+        Search game to depth 1, 2, 3, ... up to max_depth, until deadline expires, and return the
+        best move and its score (from white's point of view) of the last completed search.
+
+        Each search starts with the best moves found by the previous ones, which are kept in the
+        transposition table (a temporary one is used if this Searcher has no table). The search
+        to depth 1 is always completed. game is not changed.
+
+        Preconditions:
+            - max_depth >= 1
+        """
+        table = self.table
+        if table is None:
+            self.table = TranspositionTable()
+        self.table.new_search()
+        if self.ordering is not None:
+            self.ordering.new_search()
+        self.nodes = 0
+
+        result = self._search_root(self._board(game), 1)
+        for depth in range(2, max_depth + 1):
+            if deadline.expired():
+                break
+            # The board of an interrupted search is left in the middle of the search
+            board = self._board(game)
+            self._deadline = deadline
+            try:
+                result = self._search_root(board, depth)
+            except SearchTimeout:
+                break
+            finally:
+                self._deadline = None
+
+        self.table = table
+        return result
+
+    def _board(self, game: Any) -> BitboardOthello:
+        """
+        Return a new board in the state of game, for a search.
+        """
+        if self.evaluation == 'features':
+            return FeatureBoard.from_position(game.to_position())
+        else:
+            return BitboardOthello.from_position(game.to_position())
+
+    def _search_root(self, board: BitboardOthello, depth: int) -> tuple:
+        """
+        Search board to depth and return the best move and its score, from white's point of view.
+        """
+        self._pv = [[] for _ in range(0, depth + 1)]
+        score = self.negamax(board, depth, -math.inf, math.inf, 0)
+
+        self.depth = depth
+        self.pv = self._pv[0]
+        move = self.pv[0] if self.pv != [] else ('', '')
+        if board.is_white_move:
+            return (move, score)
+        else:
+            return (move, -score)
+
+    def negamax(self, board: BitboardOthello, depth: int, a: float, b: float, ply: int) -> float:
+        """
+        Return the score of board searched to depth with alpha-beta pruning, from the point of
+        view of the player to move. The principal variation from board is saved in self._pv[ply].
+
+        If the score is at most a, it is an upper bound of the exact score; if it is at least b,
+        it is a lower bound.
+        """
+        self.nodes += 1
+        self._pv[ply] = []
+        # Checking the time is slow, so only do it once every 1024 positions
+        if self._deadline is not None and self.nodes % 1024 == 0 and self._deadline.expired():
+            raise SearchTimeout
+
+        # Case 1: leaf
+        if depth == 0:
+            if self.evaluation == 'leaf':
+                w, bl = board.score()
+                score = leaf_score(board.previous_move, board.is_white_move, w, bl)
+            elif self.evaluation == 'features':
+                score = evaluate_features(board)
+            elif self.evaluation == 'patterns':
+                score = self._patterns.evaluate(board.white, board.black)
+            else:
+                score = evaluate(board.white, board.black)
+            return score if board.is_white_move else -score
+
+        moves = board.get_valid_moves_now()
+
+        # Case 2: no valid moves, the game is over or the player has to pass
+        if moves == []:
+            if board.get_winner() != -100:
+                score = end_score(*board.score())
+                return score if board.is_white_move else -score
+
+            board.make_move(-1, -1)
+            score = -self.negamax(board, depth - 1, -b, -a, ply + 1)
+            board.undo_move()
+            self._pv[ply] = [('', '')] + self._pv[ply + 1]
+            return score
+
+        # Case 3: score all the leaves below this position at once
+        if depth == 1 and self.evaluation == 'batch' and len(moves) >= BATCH_MIN_MOVES:
+            return self._negamax_batch(board, moves, ply)
+
+        # Case 4: search the valid moves, the best move of a previous search first
+        a_start = a
+        table_move = None
+        if self.table is not None:
+            entry = self.table.lookup(board.zobrist)
+            if entry is not None:
+                if ply > 0 and entry.cutoff(depth, a, b):
+                    return entry.score
+                if entry.best_move in moves:
+                    table_move = entry.best_move
+
+        if self.ordering is not None:
+            moves = self.ordering.order(board, moves, depth, table_move)
+        elif table_move is not None:
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+
+        best_score = -math.inf
+        best_move = None
+        for move in moves:
+            board.make_move(move[0], move[1])
+            score = -self.negamax(board, depth - 1, -b, -a, ply + 1)
+            board.undo_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > a:
+                    a = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if a >= b:
+                        if self.ordering is not None:
+                            self.ordering.record_cutoff(board.is_white_move, move, depth)
+                        break
+
+        if self._pv[ply] == []:
+            # Every move failed low; the best of them still leads the variation
+            self._pv[ply] = [best_move]
+
+        if self.table is not None:
+            if best_score <= a_start:
+                bound = UPPER
+            elif best_score >= b:
+                bound = LOWER
+            else:
+                bound = EXACT
+            self.table.store(board.zobrist, depth, best_score, bound, best_move)
+
+        return best_score
+
+    def _negamax_batch(self, board: BitboardOthello, moves: list, ply: int) -> float:
+        """
+        Return the score of board searched to depth 1, from the point of view of the player to
+        move, scoring the positions after each of moves with one call to evaluate_batch.
+
+        Every move is scored, so the score is exact.
+        """
+        if board.is_white_move:
+            own, opp = board.white, board.black
+        else:
+            own, opp = board.black, board.white
+
+        children = np.empty((len(moves), 2), dtype=np.uint64)
+        for i, move in enumerate(moves):
+            square = move[0] * 8 + move[1]
+            flipped = flips(own, opp, square)
+            new_own, new_opp = own | flipped | (1 << square), opp & ~flipped
+            if board.is_white_move:
+                children[i] = (new_own, new_opp)
+            else:
+                children[i] = (new_opp, new_own)
+        self.nodes += len(moves)
+
+        scores = evaluate_batch(children)
+        if not board.is_white_move:
+            scores = -scores
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+
+        self._pv[ply] = [moves[best]]
+        if self.table is not None:
+            self.table.store(board.zobrist, 1, best_score, EXACT, moves[best])
+        return best_score
@@ -0,0 +1,138 @@
+"""
+Objective: This file contains the transposition table used by the computer players. The table
+           remembers the result of searching a position (keyed by its Zobrist hash), so that a
+           position reached again through a different move order, or again on a later turn, does
+           not need to be searched from scratch.
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+from typing import Any
+
+# Bound types of a stored score
+EXACT = 0   # the score is the exact score of the position
+LOWER = 1   # the search failed high: the exact score is at least the stored score
+UPPER = 2   # the search failed low: the exact score is at most the stored score
+
+
+class TableEntry:
+    """
+    The result of searching one position.
+
+    Instance Attributes:
+        - key: the Zobrist hash of the position
+        - depth: the depth the position was searched to
+        - score: the score found by the search
+        - bound: whether score is EXACT, a LOWER bound or an UPPER bound
+        - best_move: the best move found by the search, or None
+        - generation: the search (see TranspositionTable.new_search) which stored the entry
+    """
+    __slots__ = ('key', 'depth', 'score', 'bound', 'best_move', 'generation')
+    key: int
+    depth: int
+    score: float
+    bound: int
+    best_move: Any
+    generation: int
+
+    def __init__(self, key: int, depth: int, score: float, bound: int, best_move: Any,
+                 generation: int) -> None:
+        self.key = key
+        self.depth = depth
+        self.score = score
+        self.bound = bound
+        self.best_move = best_move
+        self.generation = generation
+
+    def cutoff(self, depth: int, a: float, b: float) -> bool:
+        """
+        Return whether this entry decides the score of a search to depth with window (a, b).
+        """
+        if self.depth < depth:
+            return False
+        return self.bound == EXACT or (self.bound == LOWER and self.score >= b) \
+            or (self.bound == UPPER and self.score <= a)
+
+
+class TranspositionTable:
+    """
+    A transposition table with a fixed number of slots. A position is stored in the slot given by
+    its Zobrist hash modulo the size of the table.
+
+    When two positions need the same slot, the replacement policy decides which one is kept:
+        - 'depth': keep the deeper search, unless the stored entry is from an older search
+        - 'always': always keep the newest entry
+
+    The same table can be used for many searches (e.g. every cpu_make_move of a Player); call
+    new_search before each one so that entries of older searches are replaced first.
+
+    Instance Attributes:
+        - size: the number of slots
+        - policy: the replacement policy, either 'depth' or 'always'
+        - probes: the number of lookups
+        - hits: the number of lookups which found the position
+    """
+    # Private Instance Attributes:
+    #   - _slots: the entries, None for an empty slot
+    #   - _generation: the number of the current search
+    size: int
+    policy: str
+    probes: int
+    hits: int
+    _slots: list
+    _generation: int
+
+    def __init__(self, size: int = 1 << 16, policy: str = 'depth') -> None:
+        if policy not in ('depth', 'always'):
+            raise ValueError(f'Unknown replacement policy: {policy}')
+
+        self.size = size
+        self.policy = policy
+        self.probes = 0
+        self.hits = 0
+        self._slots = [None] * size
+        self._generation = 0
+
+    def new_search(self) -> None:
+        """
+        Mark the start of a new search. Entries of older searches are kept, but are replaced
+        before entries of the new search.
+        """
+        self._generation += 1
+
+    def lookup(self, key: int) -> Any:
+        """
+        Return the entry of the position with the Zobrist hash key, or None if it is not stored.
+        """
+        self.probes += 1
+        entry = self._slots[key % self.size]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: int, best_move: Any) -> None:
+        """
+        Store the result of searching the position with the Zobrist hash key, according to the
+        replacement policy.
+        """
+        index = key % self.size
+        entry = self._slots[index]
+        if entry is None or self.policy == 'always' or entry.key == key \
+                or entry.generation != self._generation or depth >= entry.depth:
+            self._slots[index] = TableEntry(key, depth, score, bound, best_move, self._generation)
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        self._slots = [None] * self.size
+        self.probes = 0
+        self.hits = 0
+
+    def hit_rate(self) -> float:
+        """
+        Return the fraction of lookups which found the position.
+        """
+        if self.probes == 0:
+            return 0.0
+        return self.hits / self.probes
@@ -8,13 +8,18 @@ This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
 """
 import math
 import random
-from typing import Any
+import threading
+import time
+from typing import Any, Optional
 
 import pygame
 
 import GameEngine_AI
+from Analysis_AI import MoveAnalysis
 from GameTree_Game import GameTree
+from OpeningBook_AI import default_book
 from Othello_Game import Othello
+from Search_AI import Deadline
 
 # Initialize pygame
 pygame.init()
@@ -26,7 +31,23 @@ font_tiny = pygame.font.SysFont("monospace", 25)
 
 # Pygame Display Settings
 SWIDTH, SLENGTH = 1600, 900
-FPS = 300
+FPS = 60
+
+# The colors and areas of the window which are drawn again when they change
+BACKGROUND_COLOR = (200, 0, 0)
+STRATEGY_COLOR = (0, 125, 255)
+SCORE_BOX = (100, 725, 650, 200)
+
+# Rendered texts, by (font, text, color), and the fonts of the buttons, by size (see render_text)
+TEXT_CACHE_SIZE = 1024
+_text_cache = {}
+_button_fonts = {}
+
+# The number of seconds the computer may think about each move
+CPU_TIME_BUDGET = 3.0
+
+# The depth of the analysis which rates the moves of both players and gives hints
+ANALYSIS_DEPTH = 4
 
 # If the player/move is 1, it means white is the Player who should move
 IS_WHITE_MOVE = {1: True, -1: False}
@@ -45,6 +66,22 @@ def initialize_screen(screen_size: tuple[int, int], color: tuple[int, int, int])
     return screen
 
 
+def render_text(font: pygame.font.Font, text: str, color: tuple) -> pygame.Surface:
+    """
+    Return text rendered with font in color.
+
+    Rendered texts are cached, so that the labels drawn again and again are only rendered once.
+    """
+    key = (font, text, color)
+    surface = _text_cache.get(key)
+    if surface is None:
+        if len(_text_cache) >= TEXT_CACHE_SIZE:
+            _text_cache.clear()
+        surface = font.render(text, True, color)
+        _text_cache[key] = surface
+    return surface
+
+
 def main_menu(player_color: int) -> None:
     """
     Othello Game
@@ -53,7 +90,7 @@ def main_menu(player_color: int) -> None:
     """
 
     # Initialize screen
-    screen = initialize_screen((SWIDTH, SLENGTH), (200, 0, 0))
+    screen = initialize_screen((SWIDTH, SLENGTH), BACKGROUND_COLOR)
     clock = pygame.time.Clock()
     running = True
 
@@ -80,10 +117,24 @@ def main_menu(player_color: int) -> None:
     past_moves = []
     start = 0
 
+    # The scores of the moves of every position of the game, for the accuracy of the moves, the
+    # hint and the best move (each position is analysed once, in the background when possible)
+    analysis = MoveAnalysis(ANALYSIS_DEPTH)
+    best_grid = ('START', 'START')
+
+    # The search of the computer for its move, running in the background (None when it is not
+    # the computer's turn)
+    search = None
+    # The computer thinking about its next move while the player thinks (None when it is not)
+    pondering = None
+
     # Initialize Computer Player (Default Settings)
-    cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 4, 57, 7, 0.5)
+    cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 4, 57, 7, 0.5, CPU_TIME_BUDGET,
+                                      book=default_book())
     cpu.initialize_gametree(game)
     # print(cpu.gametree)
+    if IS_WHITE_MOVE[player_color] == game.is_white_move:
+        pondering = ComputerSearch(cpu, game, None, analysis, pondering=True)
 
     # Initialize buttons
     drawing = Drawing(screen, (100, 100, 600, 600))
@@ -92,11 +143,11 @@ def main_menu(player_color: int) -> None:
     grid_buttons = list(drawing.draw_grid_buttons(game.make_move).values())
     grid = ('START', 'START')
 
-    # Draw game state
-    game.draw_game_state(screen, (100, 100, 600, 600))
+    # Draw the background of the Strategy Feedback System
+    drawing.draw_strategy_system()
 
     # Button 2: CPU difficulty button
-    text = font_big.render('AI Difficulty', True, (0, 0, 0))
+    text = render_text(font_big, 'AI Difficulty', (0, 0, 0))
     screen.blit(text, (10, 25))
     cpu_button = Button(screen, (255, 255, 255), (425, 15, 250, 75), None, None,
                         text=['Impossible', 'Expert', 'Professional', 'Intermediate', 'Beginner'],
@@ -114,6 +165,21 @@ def main_menu(player_color: int) -> None:
                           text=['CPU: BLACK', 'CPU: WHITE', 'CPU: RANDOM'], text_cycle=color_cycle)
     color_button.draw()
 
+    # Button 5: Restart button
+    restart_button = Button(screen, (255, 255, 255), (1475, 0, 125, 40), main_menu, player_color,
+                            text=['RESTART'], text_cycle=1)
+
+    # Only what changed since the last frame is drawn again: each frame keeps what it drew last
+    # (the board is kept by drawing), and sends the rectangles it drew to the display. The first
+    # frame sends the whole window.
+    dirty = [screen.get_rect()]
+    drawn_hint = None
+    drawn_status = None
+    drawn_lines = None
+    drawn_rows = 0
+    board_key = None
+    winner = -100
+
     # Begin Application
     while running:
 
@@ -127,119 +193,96 @@ def main_menu(player_color: int) -> None:
         else:
             wanted_player = 0
 
+        restart_button.args = wanted_player
+
         ############################################################################################
-        # Find the best move (so we can give hints to the player using hint_button
+        # Computer makes the first move if it is black
         ############################################################################################
-        if player_color == 1:
-            best = -math.inf
-        else:
-            best = math.inf
+        if not game.is_white_move and cpu_color == -1 and start == 0:
+            start = 1
+            search = ComputerSearch(cpu, game, CPU_TIME_BUDGET, analysis)
 
         ############################################################################################
-        # Update the following buttons: hint_button, restart_button, cpu_button
+        # Update the board (only the squares which changed) and the winner
         ############################################################################################
-        # Update hint_button (if hovered)
-        hint_button.text = ['HINT', str(wanted_move)]
-        if hint_button.hover(pos):
-            hint_button.text_cycle = 1
-            hint_button.draw()
-        else:
-            hint_button.text_cycle = 0
-            hint_button.draw()
+        if (game.zobrist, game.previous_move) != board_key:
+            board_key = (game.zobrist, game.previous_move)
+            winner = game.get_winner()
+            dirty.extend(drawing.update_board(game))
+            wanted_move = None
 
-        # Update restart_button (if clicked)
-        restart_button = Button(screen, (255, 255, 255), (1475, 0, 125, 40), main_menu,
-                                wanted_player,
-                                text=['RESTART'], text_cycle=1)
-        restart_button.draw()
+        ############################################################################################
+        # Find the best move (so we can give hints to the player using hint_button), once the
+        # position of the player is analysed
+        ############################################################################################
+        if wanted_move is None and IS_WHITE_MOVE[player_color] == game.is_white_move \
+                and search is None and analysis.is_analysed(game):
+            wanted_move = analysis.best_move(game)
 
         ############################################################################################
-        # Update the current player, game score, and winner
+        # Update the hint_button (if hovered)
         ############################################################################################
-        # Update the current player and game score
-        if game.is_white_move:
-            player = 'White'
-        else:
-            player = 'Black'
-        text1 = font_big.render(f'Current Player: {player}', True, (0, 0, 0))
-        text2 = font_big.render(f'White: {game.score()[0]} Black: {game.score()[1]}', True,
-                                (0, 0, 0))
-        screen.fill((200, 0, 0), (100, 725, 650, 200))
-        screen.blit(text1, (100, 725))
-        screen.blit(text2, (100, 775))
+        hint = (hint_button.hover(pos), wanted_move)
+        if hint != drawn_hint:
+            drawn_hint = hint
+            hint_button.text = ['HINT', str(wanted_move)]
+            hint_button.text_cycle = 1 if hint[0] else 0
+            dirty.append(hint_button.draw())
 
         ############################################################################################
-        # Computer makes the first move if it is black
+        # Update the current player, game score, and winner
         ############################################################################################
-        if not game.is_white_move and cpu_color == -1 and start == 0:
-            pygame.display.flip()
-            pygame.time.wait(1000)
-            move = cpu.cpu_make_move(game)
-            start = 1
-            first_blood = game.make_move(move[0], move[1])
+        # Show that the computer is thinking (the dots move while the window is responding)
+        if search is not None:
+            dots = '.' * (pygame.time.get_ticks() // 400 % 4)
+            thinking = f'CPU thinking{dots:<3} SPACE: move now, ESC: take back'
+        else:
+            thinking = None
+
+        status = (game.is_white_move, game.score(), winner, thinking)
+        if status != drawn_status:
+            drawn_status = status
+            if game.is_white_move:
+                player = 'White'
+            else:
+                player = 'Black'
             w, b = game.score()
-            past_moves.append((move, first_blood, w, b, 1))
-            game.draw_game_state(screen, (100, 100, 600, 600))
-
-        # Check winner and update if game is over
-        if game.get_valid_moves_black() == set() == game.get_valid_moves_white():
-            if game.get_winner() != -100:
-                if game.get_winner() == 1:
-                    text3 = font_big.render(f'WHITE WINS!', True,
-                                            (255, 255, 255))
-                elif game.get_winner() == -1:
-                    text3 = font_big.render(f'BLACK WINS!', True,
-                                            (255, 255, 255))
+            screen.fill(BACKGROUND_COLOR, SCORE_BOX)
+            screen.blit(render_text(font_big, f'Current Player: {player}', (0, 0, 0)), (100, 725))
+            screen.blit(render_text(font_big, f'White: {w} Black: {b}', (0, 0, 0)), (100, 775))
+
+            # Check winner and update if game is over
+            if winner != -100:
+                if winner == 1:
+                    text3 = render_text(font_big, 'WHITE WINS!', (255, 255, 255))
+                elif winner == -1:
+                    text3 = render_text(font_big, 'BLACK WINS!', (255, 255, 255))
                 else:
-                    text3 = font_big.render(f'DRAW!', True,
-                                            (255, 255, 255))
-
+                    text3 = render_text(font_big, 'DRAW!', (255, 255, 255))
                 screen.blit(text3, (100, 825))
+            elif thinking is not None:
+                screen.blit(render_text(font_small, thinking, (255, 255, 255)), (100, 835))
 
-        if game.get_winner() != -100:
-            if game.get_winner() == 1:
-                text3 = font_big.render(f'WHITE WINS!', True,
-                                        (255, 255, 255))
-            elif game.get_winner() == -1:
-                text3 = font_big.render(f'BLACK WINS!', True,
-                                        (255, 255, 255))
-            else:
-                text3 = font_big.render(f'DRAW!', True,
-                                        (255, 255, 255))
-
-            screen.blit(text3, (100, 825))
+            dirty.append(pygame.Rect(SCORE_BOX))
 
         ############################################################################################
         # Update strategic feedback system
         ############################################################################################
-        drawing.draw_strategy_system()
-        text = font_small.render(f'Your Previous Move: {grid}', True, (0, 0, 0))
-        screen.blit(text, (850 - 50, 125))
-        text = font_small.render(f'Best Move: {0, 0}', True, (0, 0, 0))
-        screen.blit(text, (850 - 50, 160))
-        text = font_small.render('Move', True, (0, 0, 0))
-        screen.blit(text, (860 - 50, 200))
-        text = font_small.render('Score', True, (0, 0, 0))
-        screen.blit(text, (960 - 50, 200))
-        text = font_small.render('Accuracy', True, (0, 0, 0))
-        screen.blit(text, (1070 - 50, 200))
-        text = font_small.render('Move', True, (0, 0, 0))
-        screen.blit(text, (1250 - 50, 200))
-        text = font_small.render('Score', True, (0, 0, 0))
-        screen.blit(text, (1360 - 50, 200))
-        text = font_small.render('Accuracy', True, (0, 0, 0))
-        screen.blit(text, (1480 - 50, 200))
-
-        for i in range(0, len(past_moves)):
-            pm = past_moves
-            text = font_tiny.render(
-                f'{i + 1:}:{pm[i][0]}',
-                True, (0, 0, 0))
-            screen.blit(text, (800 - 50 + 400 * math.floor(i // 30), 225 + (i % 30) * 20))
-            text = font_tiny.render(
-                f'           {pm[i][2]}: {pm[i][3]}   {pm[i][4]}',
-                True, (0, 0, 0))
-            screen.blit(text, (800 - 50 + 400 * math.floor(i // 30), 225 + (i % 30) * 20))
+        # If a move was taken back, its row is erased by drawing the whole system again
+        if len(past_moves) < drawn_rows:
+            dirty.append(drawing.draw_strategy_system())
+            drawn_lines = None
+            drawn_rows = 0
+
+        lines = (f'Your Previous Move: {grid}', f'Best Move: {best_grid}')
+        if lines != drawn_lines:
+            drawn_lines = lines
+            dirty.append(drawing.draw_strategy_text(lines[0], 125))
+            dirty.append(drawing.draw_strategy_text(lines[1], 160))
+
+        if len(past_moves) > drawn_rows:
+            dirty.extend(drawing.draw_history(past_moves, drawn_rows))
+            drawn_rows = len(past_moves)
 
         ############################################################################################
         # Check any input events
@@ -249,62 +292,79 @@ def main_menu(player_color: int) -> None:
             pos = pygame.mouse.get_pos()
             # events
             if event.type == pygame.QUIT:
+                if search is not None:
+                    search.cancel()
+                if pondering is not None:
+                    pondering.cancel()
                 running = 0
                 pygame.quit()
+
+            # Force the computer to move now, or take back the player's move and cancel the
+            # search (the computer's first move cannot be taken back)
+            if event.type == pygame.KEYDOWN and search is not None:
+                if event.key == pygame.K_SPACE:
+                    search.answer_now()
+                elif event.key == pygame.K_ESCAPE and past_moves != []:
+                    search.cancel()
+
             if event.type == pygame.MOUSEBUTTONDOWN:
 
                 # Update cpu_button, restart_button, color_button
-                if len(past_moves) < 3:
+                if len(past_moves) < 3 and search is None:
                     if cpu_button.hover(pos):
                         cpu_button.text_cycle = cpu_button.execute1()
-                        cpu_button.draw()
+                        dirty.append(cpu_button.draw())
+                        if pondering is not None:
+                            pondering.stop()
+                            pondering = None
 
                         # Update computer difficulty
                         if cpu_button.text_cycle % 5 == 0:
-                            cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 4, 57, 7, 0.0)
+                            cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 4, 57, 7, 0.0,
+                                                              CPU_TIME_BUDGET,
+                                                              book=default_book())
                             cpu.initialize_gametree(game)
                         elif cpu_button.text_cycle % 5 == 1:
-                            cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 4, 57, 7, 0.2)
+                            cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 4, 57, 7, 0.2,
+                                                              CPU_TIME_BUDGET,
+                                                              book=default_book())
                             cpu.initialize_gametree(game)
                         elif cpu_button.text_cycle % 5 == 2:
-                            cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 3, 55, 5, 0.5)
+                            cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 3, 55, 5, 0.5,
+                                                              CPU_TIME_BUDGET,
+                                                              book=default_book())
                             cpu.initialize_gametree(game)
                         elif cpu_button.text_cycle % 5 == 3:
-                            cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 3, 55, 5, 0.7)
+                            cpu = GameEngine_AI.SmartPlayerv2(cpu_color, 3, 55, 5, 0.7,
+                                                              CPU_TIME_BUDGET,
+                                                              book=default_book())
                             cpu.initialize_gametree(game)
                         elif cpu_button.text_cycle % 5 == 4:
                             cpu = GameEngine_AI.RandomPlayer(cpu_color, 0, 0, 0, 0)
                             cpu.initialize_gametree(game)
 
+                        if game.get_winner() == -100:
+                            pondering = ComputerSearch(cpu, game, None, analysis,
+                                                       pondering=True)
+
                 if restart_button.hover(pos):
+                    if search is not None:
+                        search.cancel()
+                    if pondering is not None:
+                        pondering.cancel()
                     restart_button.execute1()
                 if color_button.hover(pos):
                     color_button.text_cycle = color_button.execute1()
-                    color_button.draw()
+                    dirty.append(color_button.draw())
 
                 # Update grid_button (according to which grid on the board is clicked)
                 for i in range(0, len(grid_buttons)):
                     # If it is the human player's move ...
                     if grid_buttons[i].hover(pos) and IS_WHITE_MOVE[player_color] == \
-                            game.is_white_move and game.get_winner() == -100:
-
-                        # First, make a game tree to help determine move accuracy
-                        # move accuracy determines how good the move made by the player is
-                        gametree = GameTree(game)
-                        gametree.generate_moves_quick(2)
-                        scores = [s.score for s in gametree.get_subtrees()]
-                        scores.sort()
-                        # print(scores)
-
-                        # Second, calculate possible accuracy range
-                        max_score = 0
-                        min_score = 0
-                        if gametree.get_subtrees() != []:
-                            max_score = max(s.score for s in gametree.get_subtrees())
-                            min_score = min(s.score for s in gametree.get_subtrees())
-                            maxmindiff = abs(max_score - min_score)
-                        else:
-                            maxmindiff = 0
+                            game.is_white_move and game.get_winner() == -100 and search is None:
+
+                        # Keep the game state before the move, to rate the move
+                        before = game.copy()
 
                         # Press the grid and turn is the coordinate of that grid
                         turn = grid_buttons[i].execute()
@@ -315,91 +375,153 @@ def main_menu(player_color: int) -> None:
                             if turn[0] == -99:
                                 turn[0] = 0  # if we have no move, we capture 0 pieces
                             grid = turn[1]  # grid is a tuple = move
+
+                            # Stop the computer thinking, which goes on from the player's move
+                            if pondering is not None:
+                                pondering.stop()
+                                pondering = None
                             captures = turn[2]
                             w, b = game.score()
 
-                            # Calculate accuracy of the move made
-                            if maxmindiff == 0:
-                                accuracy = 1
-                            else:
-                                move_tree = gametree.find_subtree_by_move(grid)
-                                if move_tree is None:
-                                    accuracy = 0.00
-                                else:
-                                    if player_color == 1:
-                                        accuracy = abs(move_tree.score - min_score) / maxmindiff
-                                    else:
-                                        accuracy = abs(move_tree.score - max_score) / maxmindiff
+                            # Calculate accuracy of the move made, and find the best move
+                            # (the position was analysed while the player was thinking)
+                            accuracy = analysis.accuracy(before, grid)
+                            best_grid = analysis.best_move(before)
 
                             # Play the move
                             past_moves.append((grid, captures, w, b, round(accuracy, 2)))
 
-                            # Update the game board after human player moves
-                            game.draw_game_state(screen, (100, 100, 600, 600))
-
-                            # Calculate possible accuracy range of computer player
-                            cpu_max_score = 0
-                            cpu_min_score = 0
-                            if cpu.gametree.get_subtrees() != []:
-                                cpu_max_score = max(s.score for s in gametree.get_subtrees())
-                                cpu_min_score = min(s.score for s in gametree.get_subtrees())
-                                cpu_maxmindiff = abs(cpu_max_score - cpu_min_score)
-                            else:
-                                cpu_maxmindiff = 0
-                            # print(cpu_maxmindiff)
-
-                            # Update the current player
-                            if cpu_color == -1:
-                                current_color = 'Black'
-                            else:
-                                current_color = 'White'
-                            text = font_big.render(f'Current Player: {current_color}',
-                                                   True, (0, 0, 0))
-                            screen.fill((200, 0, 0), (100, 725, 650, 200))
-                            screen.blit(text, (100, 725))
-
-                            # Computer calculates the best move and return that move
-                            cpu_move = cpu.cpu_make_move(game)
-
-                            # Calculate accuracy of the move made by computer
-                            if cpu_maxmindiff == 0:
-                                cpu_accuracy = 1
-                            else:
-                                move_tree = gametree.find_subtree_by_move(cpu_move)
-                                if move_tree is None:
-                                    cpu_accuracy = 0.00
-                                else:
-                                    if cpu_color == 1:
-                                        cpu_accuracy = abs(
-                                            move_tree.score - cpu_min_score) / cpu_maxmindiff
-                                    else:
-                                        cpu_accuracy = abs(
-                                            move_tree.score - cpu_max_score) / cpu_maxmindiff
-
-                            cpu_captures = game.make_move(cpu_move[0], cpu_move[1])
-                            w, b = game.score()
-                            past_moves.append(
-                                (cpu_move, cpu_captures, w, b, round(cpu_accuracy, 2)))
-
-                            # Find the current best move so we can give a hint to the player
-                            for s in cpu.gametree.get_subtrees():
-                                if player_color == 1:
-                                    if s.score > best:
-                                        wanted_move = s.move
-                                else:
-                                    if s.score < best:
-                                        wanted_move = s.move
-
-                            # update Surface
-                            pygame.display.flip()
-                            game.draw_game_state(screen, (100, 100, 600, 600))
-
-        # update Surface
+                            # The computer searches for its move in the background
+                            search = ComputerSearch(cpu, game, CPU_TIME_BUDGET, analysis)
+
+        ############################################################################################
+        # Play the move of the computer once its search is done
+        ############################################################################################
+        if search is not None and search.done():
+            if search.cancelled:
+                # Take back the player's move; the computer starts a new GameTree from there
+                if running and past_moves != []:
+                    game.undo_move()
+                    past_moves.pop()
+                    cpu.gametree = GameTree(game)
+                    pondering = ComputerSearch(cpu, game, None, analysis, pondering=True)
+            else:
+                cpu_move = search.move
+
+                # Calculate accuracy of the move made by computer (its position was analysed
+                # before its search)
+                cpu_accuracy = analysis.accuracy(search.game, cpu_move)
+
+                cpu_captures = game.make_move(cpu_move[0], cpu_move[1])
+                w, b = game.score()
+                past_moves.append(
+                    (cpu_move, cpu_captures, w, b, round(cpu_accuracy, 2)))
+
+                # The computer thinks about its next move while the player thinks
+                if game.get_winner() == -100:
+                    pondering = ComputerSearch(cpu, game, None, analysis, pondering=True)
+
+            search = None
+
+        # Send what was drawn to the display
         if running:
-            pygame.display.update()
+            if dirty != []:
+                pygame.display.update(dirty)
+                dirty = []
             clock.tick(FPS)
 
 
+####################################################################################
+# helper functions/classes (Computer Player)
+####################################################################################
+class ComputerSearch:
+    """
+    The search of the computer player for its next move, run on a background thread so that the
+    window keeps responding (and drawing) while the computer thinks.
+
+    The search is given a copy of the game, so the game can be drawn meanwhile; the computer
+    player and the analysis must not be used until the search is done.
+
+    Before searching, the position is analysed (see Analysis_AI), so that the moves made from it
+    can be rated at once. The time of the search only starts once the analysis is done.
+
+    Instance Attributes:
+        - game: the game state searched (a copy)
+        - deadline: the deadline of the search, expired to make the computer answer early (even
+                    during the analysis)
+        - cancelled: whether the search was cancelled, in which case its move is not played
+        - move: the move found by the search, or None until it is done
+        - pondering: whether the search is the computer thinking during the player's turn (see
+                     Player.ponder), which finds no move and only lasts until it is stopped
+    """
+    # Private Instance Attributes:
+    #   - _seconds: the time limit of the search, or None if it has none
+    #   - _thread: the thread running the search
+    game: Othello
+    deadline: Deadline
+    cancelled: bool
+    move: Optional[tuple]
+    pondering: bool
+    _seconds: Optional[float]
+    _thread: threading.Thread
+
+    def __init__(self, cpu: Any, game: Othello, seconds: Optional[float], analysis: MoveAnalysis,
+                 pondering: bool = False) -> None:
+        """
+        Start the analysis of game and the search of cpu for its move in game, which takes at
+        most seconds after the analysis (or has no time limit if seconds is None).
+        """
+        self.game = game.copy()
+        self.deadline = Deadline()
+        self._seconds = seconds
+        self.cancelled = False
+        self.move = None
+        self.pondering = pondering
+        self._thread = threading.Thread(target=self._run, args=(cpu, analysis), daemon=True)
+        self._thread.start()
+
+    def _run(self, cpu: Any, analysis: MoveAnalysis) -> None:
+        """
+        Analyse self.game, then search for the move of cpu in it (on the background thread).
+        """
+        if self.pondering:
+            # The GameTree of the computer starts at the player's position
+            analysis.scores(self.game, cpu.gametree)
+            cpu.ponder(self.deadline)
+        else:
+            # The GameTree of the computer has the player's move below its root
+            analysis.scores(self.game, cpu.gametree.find_subtree_by_move(self.game.previous_move))
+            if self._seconds is not None:
+                self.deadline.end = time.monotonic() + self._seconds
+            self.move = cpu.cpu_make_move(self.game.copy(), self.deadline)
+
+    def done(self) -> bool:
+        """
+        Return whether the search is over.
+        """
+        return not self._thread.is_alive()
+
+    def answer_now(self) -> None:
+        """
+        Make the computer play the best move it has found so far.
+        """
+        self.deadline.expire()
+
+    def cancel(self) -> None:
+        """
+        Stop the search as soon as possible, and do not play its move.
+        """
+        self.cancelled = True
+        self.deadline.expire()
+
+    def stop(self) -> None:
+        """
+        Cancel the search, and wait until it is over (so that the computer player can be used).
+        """
+        self.cancel()
+        self._thread.join()
+
+
 ####################################################################################
 # helper functions/classes (Drawing Othello Gameboard)
 ####################################################################################
@@ -413,15 +535,19 @@ class Drawing:
         - color: the commonly used color: [BLACK, WHITE, GREEN]
         - pos_size: the position of the button (A tuple)
                     (top-left-x-location, top-left-y-location, width, length)
+        - cells: what each square of the board shows since update_board last drew it, as
+                 (piece, whether it is a valid move, whether it is the previous move)
     """
     screen: pygame.Surface
     color: list
     pos_size: tuple
+    cells: dict
 
     def __init__(self, screen: pygame.Surface, pos_size: tuple) -> None:
         self.color = [(0, 0, 0), (255, 255, 255), (0, 150, 0)]
         self.pos_size = pos_size
         self.screen = screen
+        self.cells = {}
 
     def draw_board(self, pos_size: tuple):
         """
@@ -491,6 +617,57 @@ class Drawing:
                            center=(left + (x + 0.5) * width, top + (y + 0.5) * length),
                            radius=width * 0.45, width=3)
 
+    def update_board(self, game: Othello) -> list:
+        """
+        Draw the squares of the board which changed since the last call (every square the first
+        time) for the current state of game, and return the rectangles drawn.
+        """
+        valid_moves = game.get_valid_moves_now()
+        drawn = []
+        for i in range(0, 8):
+            for j in range(0, 8):
+                piece = game.gameboard[i][j]
+                cell = (piece, piece == 0 and (i, j) in valid_moves, (i, j) == game.previous_move)
+                if self.cells.get((i, j)) != cell:
+                    self.cells[(i, j)] = cell
+                    drawn.append(self.draw_cell((i, j), cell))
+
+        # The square of the previous move is drawn last, since it overlaps the squares around it
+        if drawn != [] and game.previous_move in self.cells:
+            self.draw_square(game.previous_move)
+        return drawn
+
+    def draw_cell(self, grid_yx: tuple, cell: tuple) -> pygame.Rect:
+        """
+        Draw one square of the board (its background, grid lines, labels and piece) as described
+        by cell (see self.cells), and return the rectangle drawn.
+        """
+        left, top, width, length = \
+            self.pos_size[0], self.pos_size[1], self.pos_size[2] / 8, self.pos_size[3] / 8
+
+        y, x = grid_yx
+        x0, y0 = left + x * width, top + y * length
+        pygame.draw.rect(surface=self.screen, color=self.color[2], rect=(x0, y0, width, length))
+        for start_pos, end_pos in [((x0, y0), (x0 + width, y0)), ((x0, y0), (x0, y0 + length)),
+                                   ((x0 + width, y0), (x0 + width, y0 + length)),
+                                   ((x0, y0 + length), (x0 + width, y0 + length))]:
+            pygame.draw.line(surface=self.screen, color=self.color[0], start_pos=start_pos,
+                             end_pos=end_pos, width=4)
+        if y == 0:
+            self.screen.blit(render_text(font_small, str(x), (0, 0, 0)), (x0, y0))
+        if x == 0:
+            self.screen.blit(render_text(font_small, str(y), (0, 0, 0)), (x0, y0))
+
+        piece, valid, _ = cell
+        if valid:
+            self.draw_piece((255, 0, 0), grid_yx)
+        elif piece == 1:
+            self.draw_piece(self.color[1], grid_yx)
+        elif piece == -1:
+            self.draw_piece(self.color[0], grid_yx)
+
+        return pygame.Rect(x0 - 2, y0 - 2, width + 5, length + 5)
+
     def draw_grid_buttons(self, func) -> dict:
         """
         Draw a button on the Othello game board
@@ -510,15 +687,51 @@ class Drawing:
 
         return buttons
 
-    def draw_strategy_system(self) -> None:
+    def draw_strategy_system(self) -> pygame.Rect:
         """
-        Draw the background of the Strategy Feedback System
+        Draw the background and the column titles of the Strategy Feedback System, and return
+        the rectangle drawn.
         """
         topx = self.pos_size[0] * 2 + self.pos_size[2] - 50
         topy = self.pos_size[1]
         width = SWIDTH - 25 - topx
         length = SLENGTH - 50 - topy
-        pygame.draw.rect(self.screen, color=(0, 125, 255), rect=(topx, topy, width, length))
+        pygame.draw.rect(self.screen, color=STRATEGY_COLOR, rect=(topx, topy, width, length))
+
+        for title, x in [('Move', 860), ('Score', 960), ('Accuracy', 1070), ('Move', 1250),
+                         ('Score', 1360), ('Accuracy', 1480)]:
+            self.screen.blit(render_text(font_small, title, (0, 0, 0)), (x - 50, 200))
+
+        return pygame.Rect(topx, topy, width, length)
+
+    def draw_strategy_text(self, text: str, y: int) -> pygame.Rect:
+        """
+        Draw a line of text at height y of the Strategy Feedback System, over the line drawn
+        there before, and return the rectangle drawn.
+        """
+        topx = self.pos_size[0] * 2 + self.pos_size[2] - 50
+        line = pygame.Rect(topx, y, SWIDTH - 25 - topx, font_small.get_height())
+        pygame.draw.rect(self.screen, color=STRATEGY_COLOR, rect=line)
+        self.screen.blit(render_text(font_small, text, (0, 0, 0)), (850 - 50, y))
+        return line
+
+    def draw_history(self, past_moves: list, start: int) -> list:
+        """
+        Draw the rows of the table of past_moves of the Strategy Feedback System from the row of
+        past_moves[start] (the rows before it are already drawn), and return the rectangles
+        drawn.
+        """
+        drawn = []
+        for i in range(start, len(past_moves)):
+            pm = past_moves
+            row = (800 - 50 + 400 * math.floor(i // 30), 225 + (i % 30) * 20)
+            move = render_text(font_tiny, f'{i + 1:}:{pm[i][0]}', (0, 0, 0))
+            result = render_text(font_tiny, f'           {pm[i][2]}: {pm[i][3]}   {pm[i][4]}',
+                                 (0, 0, 0))
+            self.screen.blit(move, row)
+            self.screen.blit(result, row)
+            drawn.append(move.get_rect(topleft=row).union(result.get_rect(topleft=row)))
+        return drawn
 
 
 ####################################################################################
@@ -562,21 +775,25 @@ class Button:
 
         self.draw()
 
-    def draw(self) -> None:
+    def draw(self) -> pygame.Rect:
         """
-        Draw the button
+        Draw the button, and return the rectangle drawn
         """
         pygame.draw.rect(self.screen, self.color, self.position)
 
         if self.text != []:
             current_text = self.text[self.text_cycle % len(self.text)]
             if self.text != '':
-                font = pygame.font.SysFont('', int(self.position[3] * 0.75))
-                text = font.render(current_text, True, (0, 0, 0))
+                size = int(self.position[3] * 0.75)
+                if size not in _button_fonts:
+                    _button_fonts[size] = pygame.font.SysFont('', size)
+                text = render_text(_button_fonts[size], current_text, (0, 0, 0))
                 text_loc = (self.position[0] + (self.position[2] / 2 - text.get_width() / 2),
                             self.position[1] + (self.position[3] / 2 - text.get_height() / 2))
                 self.screen.blit(text, text_loc)
 
+        return pygame.Rect(self.position)
+
     def hover(self, pos) -> bool:
         """
         Determine whether the mouse is on top of the button
@@ -11,23 +11,24 @@ By: Chun Yin Yan and Gabriel Pais
 This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
 """
 from Visualization import main_menu
-from GameEngine_AI import SmartPlayerv2, GameEngine
+from GameEngine_AI import NegamaxPlayer, GameEngine
 from GameTree_Game import GameTree
+from OpeningBook_AI import default_book
 
 
 # Available White CPU Players
-Impossible_W = SmartPlayerv2(1, 4, 57, 7, 0.01)
-Expert_W = SmartPlayerv2(1, 4, 57, 7, 0.15)
-Professional_W = SmartPlayerv2(1, 3, 55, 5, 0.23)
-Intermediate_W = SmartPlayerv2(1, 3, 55, 5, 0.30)
-Beginner_W = SmartPlayerv2(1, 1, 1, 1, 1)
+Impossible_W = NegamaxPlayer(1, 4, 57, 7, 0.01, endgame_empties=12, book=default_book())
+Expert_W = NegamaxPlayer(1, 4, 57, 7, 0.15, book=default_book())
+Professional_W = NegamaxPlayer(1, 3, 55, 5, 0.23, book=default_book())
+Intermediate_W = NegamaxPlayer(1, 3, 55, 5, 0.30, book=default_book())
+Beginner_W = NegamaxPlayer(1, 1, 1, 1, 1)
 
 # Available Black CPU Players
-Impossible_B = SmartPlayerv2(-1, 4, 57, 7, 0.1)
-Expert_B = SmartPlayerv2(-1, 4, 57, 7, 0.15)
-Professional_B = SmartPlayerv2(-1, 3, 55, 5, 0.23)
-Intermediate_B = SmartPlayerv2(-1, 3, 55, 5, 0.30)
-Beginner_B = SmartPlayerv2(-1, 1, 1, 1, 1)
+Impossible_B = NegamaxPlayer(-1, 4, 57, 7, 0.1, endgame_empties=12, book=default_book())
+Expert_B = NegamaxPlayer(-1, 4, 57, 7, 0.15, book=default_book())
+Professional_B = NegamaxPlayer(-1, 3, 55, 5, 0.23, book=default_book())
+Intermediate_B = NegamaxPlayer(-1, 3, 55, 5, 0.30, book=default_book())
+Beginner_B = NegamaxPlayer(-1, 1, 1, 1, 1)
 
 
 def interactive() -> None:
@@ -38,7 +39,7 @@ def interactive() -> None:
     main_menu(-1)
 
 
-def ai_test(white_player: SmartPlayerv2, black_player: SmartPlayerv2) -> dict:
+def ai_test(white_player: NegamaxPlayer, black_player: NegamaxPlayer) -> dict:
     """
     This is test shows the differences in "cleverness" of the AIs.
 
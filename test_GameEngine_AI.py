@@ -0,0 +1,36 @@
+"""
+Objective: This file contains the tests of the computer players in GameEngine_AI.
+
+This file is Copyright (c) 2021 Chun Yin Yan and Gabriel Pais
+"""
+from GameEngine_AI import SmartPlayerv2
+from GameTree_Game import GameTree
+from Othello_Game import Othello
+from Search_AI import Deadline
+
+# The moves of a game after which the player to move (black) has to pass
+PASS_GAME = [(2, 3), (4, 2), (5, 4), (1, 3), (4, 1), (5, 1), (0, 3), (4, 0), (6, 0), (6, 2)]
+
+
+def test_ponder_keeps_pass_subtree() -> None:
+    """Test that pondering on a position where the opponent has to pass keeps the subtree of
+    the pass already searched, instead of replacing it by a new one.
+    """
+    game = Othello()
+    for move in PASS_GAME:
+        game.make_move(move[0], move[1])
+    assert game.get_valid_moves_now() == [] and game.get_winner() == -100
+
+    player = SmartPlayerv2(1, 3, 64, 3, 0.0)
+    player.gametree = GameTree(game)
+    player.gametree.generate_moves_quick(3, player.table, ordering=player.ordering)
+    reply = player.gametree.find_subtree_by_move(('', ''))
+    searched_depth = reply.searched_depth
+
+    deadline = Deadline(0.0)
+    deadline.expire()
+    player.ponder(deadline)
+
+    assert player.gametree.get_subtrees() == [reply]
+    assert reply.searched_depth == searched_depth
+    assert reply.get_subtrees() != []